@@ -0,0 +1,330 @@
+'''Benchmark
+Time the assembler(p6), the VM translator(p8) and the Jack analyzer(p10) on the
+course inputs and on synthetically scaled copies of them, report lines/sec, peak
+memory and per-phase timing, and save the results in a JSON file.
+
+Each tool runs in its own process, with its project directory on sys.path, since
+the projects have modules of the same name(Parser, Code, BuildCache).'''
+
+import io
+import os
+import re
+import sys
+import glob
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+PROJECTS = os.path.join(ROOT, 'nand2tetris', 'projects')
+TOOLS = {'assembler': ('p6', '.asm', ('04', '06')),
+         'vm': ('p8', '.vm', ('07', '08', os.path.join(os.pardir, 'tools', 'OS'))),
+         'analyzer': ('p10', '.jack', ('09', '10', '11', '12'))}
+
+class Benchmark(object):
+    '''benchmark the tools, see TOOLS
+    method: run()
+    method: save(file)
+    method: compare(baseline, threshold)
+    method: report()
+    '''
+
+    def __init__(self, tools=tuple(TOOLS), scales=(1, 10), repeat=3):
+        '''tools: names in TOOLS
+        scales: copies of the course inputs in each case, 1 is the inputs themselves
+        repeat: runs of each phase, the best is reported'''
+        self.__tools = tools
+        self.__scales = scales
+        self.__repeat = repeat
+        self.__results = []
+
+    def run(self):
+        'run every tool on every scale, return: list of results'
+        with tempfile.TemporaryDirectory() as tmp:
+            for tool in self.__tools:
+                for scale in self.__scales:
+                    case = os.path.join(tmp, f'{tool}_x{scale}')
+                    _prepare(tool, scale, case)
+                    result = {'tool': tool, 'case': f'x{scale}'}
+                    result.update(self.__worker(tool, case))
+                    total = result['phases']['total']['best']
+                    result['lines_per_sec'] = result['lines'] / total if total else None
+                    self.__results.append(result)
+                    shutil.rmtree(case)
+        return self.__results
+
+    def __worker(self, tool, case):
+        'return: result of the tool on case, measured in a new process'
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', tool, case,
+                               '--repeat', str(self.__repeat)],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if proc.returncode:
+            raise RuntimeError(f'{tool} failed on {case}:\n{proc.stderr}')
+        return json.loads(proc.stdout)
+
+    def save(self, file):
+        'write the results and the environment into a JSON file'
+        with open(file, 'w') as outfile:
+            json.dump({'meta': _meta(self.__repeat), 'results': self.__results}, outfile, indent=2)
+
+    def compare(self, baseline, threshold=0.1):
+        '''compare total times with a saved JSON file
+        return: list of (tool, case, ratio) slower than 1 + threshold'''
+        with open(baseline, 'r') as file:
+            old = {(r['tool'], r['case']): r for r in json.load(file)['results']}
+        regressions = []
+        for result in self.__results:
+            before = old.get((result['tool'], result['case']))
+            if before is None:
+                continue
+            ratio = result['phases']['total']['best'] / before['phases']['total']['best']
+            result['baseline_ratio'] = ratio
+            if ratio > 1 + threshold:
+                regressions.append((result['tool'], result['case'], ratio))
+        return regressions
+
+    def report(self):
+        'return: results as a text table'
+        lines = ['{:<10}{:>6}{:>7}{:>10}{:>10}{:>12}{:>10}  {}'.format(
+            'tool', 'case', 'files', 'lines', 'total(s)', 'lines/s', 'peak(MB)', 'phases(s)')]
+        for result in self.__results:
+            phases = ' '.join('{} {:.3f}'.format(name, times['best'])
+                              for name, times in result['phases'].items() if name != 'total')
+            line = '{:<10}{:>6}{:>7}{:>10}{:>10.3f}{:>12.0f}{:>10.1f}  {}'.format(
+                result['tool'], result['case'], result['files'], result['lines'],
+                result['phases']['total']['best'], result['lines_per_sec'] or 0,
+                result['peak_bytes'] / 1e6, phases)
+            if 'baseline_ratio' in result:
+                line += '  x{:.2f} of baseline'.format(result['baseline_ratio'])
+            lines.append(line)
+        return '\n'.join(lines)
+
+def _meta(repeat):
+    'return: dict describing where the results come from'
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'repeat': repeat}
+
+def _sources(tool):
+    '''return: list of (name, files), a program of the course inputs of tool,
+    a .asm file is a program of its own, a directory of .vm or .jack files is one program'''
+    _, ext, dirs = TOOLS[tool]
+    programs = []
+    for project in dirs:
+        files = sorted(glob.glob(os.path.join(PROJECTS, project, '**', '*' + ext), recursive=True))
+        groups = {}
+        for file in files:
+            groups.setdefault(os.path.dirname(file), []).append(file)
+        for directory, group in sorted(groups.items()):
+            name = re.sub(r'\W', '_', os.path.relpath(directory, PROJECTS)).strip('_')
+            if ext == '.asm':
+                programs.extend((name + '_' + os.path.basename(f)[:-4], [f]) for f in group)
+            else:
+                programs.append((name, group))
+    return programs
+
+def _prepare(tool, scale, case):
+    '''write the inputs of tool into the directory case
+    .asm: the programs are repeated scale times with their labels renamed per copy and
+    concatenated into files that fit in the ROM
+    .vm, .jack: each program directory gets scale copies of its classes, renamed per copy'''
+    os.makedirs(case)
+    programs = _sources(tool)
+    if tool == 'assembler':
+        _prepare_asm(programs, scale, case)
+        return
+    for name, files in programs:
+        directory = os.path.join(case, name)
+        os.makedirs(directory)
+        texts = {}
+        for file in files:
+            with open(file, 'r') as infile:
+                texts[os.path.basename(file)] = infile.read()
+        ext = TOOLS[tool][1]
+        classes = [filename[:-len(ext)] for filename in texts]
+        pattern = re.compile(r'\b({})\b'.format('|'.join(map(re.escape, classes))))
+        for i in range(scale):
+            for filename, text in texts.items():
+                if i:
+                    text = pattern.sub(lambda mo: f'{mo.group(1)}_{i}', text)
+                    filename = f'{filename[:-len(ext)]}_{i}{ext}'
+                with open(os.path.join(directory, filename), 'w') as outfile:
+                    outfile.write(text)
+
+def _prepare_asm(programs, scale, case):
+    'see _prepare()'
+    label_p = re.compile(r'^\s*\(([^)]*)\)')
+    symbol_p = re.compile(r'(?<=[@(])([\w.$:]+)')
+    rom = 0x8000
+    outfile, used, n = None, 0, 0
+    for i in range(scale):
+        for _, (file,) in programs:
+            with open(file, 'r') as infile:
+                lines = infile.readlines()
+            labels = {mo.group(1) for mo in map(label_p.match, lines) if mo}
+            size = sum(1 for line in lines
+                       if line.split('//')[0].strip() and not label_p.match(line))
+            if outfile is None or used + size > rom:
+                if outfile:
+                    outfile.close()
+                outfile = open(os.path.join(case, f'Bench{n}.asm'), 'w')
+                used, n = 0, n + 1
+            used += size
+            unit = f'__{i}_{os.path.basename(file)[:-4]}'
+            outfile.writelines(symbol_p.sub(
+                lambda mo: mo.group(1) + unit if mo.group(1) in labels else mo.group(1), line)
+                               for line in lines)
+    outfile.close()
+
+def _count_lines(files):
+    'return: total number of lines in files'
+    total = 0
+    for file in files:
+        with open(file, 'rb') as infile:
+            total += sum(1 for _ in infile)
+    return total
+
+def _time(run, repeat, reset=None):
+    '''reset: called before each run, untimed
+    return: {best, mean, runs} of run() in seconds'''
+    runs = []
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        begin = time.perf_counter()
+        run()
+        runs.append(time.perf_counter() - begin)
+    return {'best': min(runs), 'mean': sum(runs) / len(runs), 'runs': runs}
+
+def _phases_assembler(case):
+    '''return: input files, list of (phase, run), the last one being the whole
+    Assembler.preprocess().gen() of every file, and reset: called before each run,
+    None if there is nothing to reset, here it clears the line cache of Parser,
+    which a command line run starts without'''
+    from Parser import Parser
+    from Code import Code
+    from Assembler import Assembler
+    files = sorted(glob.glob(os.path.join(case, '*.asm')))
+
+    def parse(file):
+        return list(Parser(file).instructions())
+    parsed = [parse(file) for file in files]
+    bincodes = [Code().assemble(instrs) for instrs in parsed]
+    phases = [('parse', lambda: [parse(file) for file in files]),
+              ('encode', lambda: [Code().assemble(instrs) for instrs in parsed]),
+              ('text', lambda: [Code.to_text(bincode) for bincode in bincodes]),
+              ('total', lambda: [Assembler(file).preprocess().gen() for file in files])]
+    return files, phases, Parser.line_cache.clear
+
+def _phases_vm(case):
+    'return: see _phases_assembler(), the whole is VMtranslator.gen() of every directory'
+    from Parser import Parser
+    from CodeWriter import CodeWriter
+    from VMtranslator import VMtranslator
+    directories = sorted(glob.glob(os.path.join(case, '*')))
+    files = sorted(glob.glob(os.path.join(case, '*', '*.vm')))
+
+    def parse(file):
+        parser = Parser(file)
+        commands = []
+        while parser.hasnext():
+            command = parser.next()
+            if command is not None:
+                commands.append(command)
+        return commands
+
+    def translate(file, commands):
+        code = CodeWriter()
+        code.setFileName(os.path.basename(file)[:-3])
+        for command in commands:
+            code.parse(command)
+        return code.fragment()
+    parsed = [parse(file) for file in files]
+    return files, [('parse', lambda: [parse(file) for file in files]),
+                   ('translate', lambda: [translate(*args) for args in zip(files, parsed)]),
+                   ('total', lambda: [VMtranslator(directory, jobs=1).gen()
+                                      for directory in directories])], None
+
+def _phases_analyzer(case):
+    'return: see _phases_assembler(), the whole is JackAnalyzer.gen() of every directory'
+    from JackTokenizer import JackTokenizer
+    from CompilationEngine import CompilationEngine
+    from XMLWriter import XMLWriter
+    from JackAnalyzer import JackAnalyzer
+    directories = sorted(glob.glob(os.path.join(case, '*')))
+    files = sorted(glob.glob(os.path.join(case, '*', '*.jack')))
+    engine = CompilationEngine()
+    tokenizers = [JackTokenizer(file) for file in files]
+    trees = [engine.parse(tokenizer) for tokenizer in tokenizers]
+
+    def parse():
+        for tokenizer in tokenizers:
+            tokenizer.rewind(0)
+            engine.parse(tokenizer)
+    return files, [('tokenize', lambda: [JackTokenizer(file) for file in files]),
+                   ('parse', parse),
+                   ('xml', lambda: [XMLWriter(io.StringIO()).visit(tree) for tree in trees]),
+                   ('total', lambda: [JackAnalyzer(directory, jobs=1).gen()
+                                      for directory in directories])], None
+
+def worker(tool, case, repeat):
+    '''measure tool on the inputs in case, runs in its own process
+    return: dict of files, lines, phases, peak_bytes(tracemalloc, of one whole run)
+    and maxrss_kb of the process, and line_cache counters of that run for the assembler,
+    every run starts as cold as a command line run, see _phases_assembler()'''
+    sys.path.insert(0, os.path.join(ROOT, TOOLS[tool][0]))
+    files, phases, reset = globals()['_phases_' + tool](case)
+    result = {'files': len(files), 'lines': _count_lines(files), 'phases': {}}
+    for name, run in phases:
+        result['phases'][name] = _time(run, repeat, reset)
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    phases[-1][1]()
+    result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if tool == 'assembler': # hit rate of one whole run
+        from Parser import Parser
+        result['line_cache'] = {'hits': Parser.line_cache.hits, 'misses': Parser.line_cache.misses,
+                                'hit_rate': Parser.line_cache.hit_rate()}
+    result['maxrss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='benchmark the assembler, '
+                                        'the VM translator and the Jack analyzer')
+    argparser.add_argument('-o', '--output', default='benchmark.json', help='JSON results file')
+    argparser.add_argument('--tools', nargs='+', choices=list(TOOLS), default=list(TOOLS))
+    argparser.add_argument('--scale', nargs='+', type=int, default=[1, 10],
+                           help='copies of the course inputs per case, e.g. 1 10 100')
+    argparser.add_argument('--repeat', type=int, default=3, help='runs of each phase')
+    argparser.add_argument('--baseline', help='JSON results to compare the total times with')
+    argparser.add_argument('--threshold', type=float, default=0.1,
+                           help='slowdown over the baseline reported as a regression')
+    argparser.add_argument('--worker', nargs=2, metavar=('TOOL', 'CASE'), help=argparse.SUPPRESS)
+    args = argparser.parse_args()
+
+    if args.worker:
+        json.dump(worker(*args.worker, args.repeat), sys.stdout)
+        sys.exit()
+
+    bench = Benchmark(args.tools, args.scale, args.repeat)
+    bench.run()
+    regressions = bench.compare(args.baseline, args.threshold) if args.baseline else []
+    bench.save(args.output)
+    print(bench.report())
+    for tool, case, ratio in regressions:
+        print(f'regression: {tool} {case} is {ratio:.2f} times the baseline')
+    if regressions:
+        sys.exit(1)
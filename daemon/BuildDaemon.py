@@ -0,0 +1,265 @@
+'''BuildDaemon
+Keep the assembler(p6), the VM translator(p8), the Jack analyzer(p10) and the Jack
+compiler(p11) loaded in worker processes and run build jobs sent over a Unix domain
+socket, so that a build does not pay for starting Python and importing the tools.
+
+A job is one line of JSON, the reply is one line of JSON with the same id:
+    {"id": 1, "tool": "vm", "src": "/abs/path/Dir", "options": {"shared": true}}
+    {"id": 1, "ok": true, "errors": [], "output": "", "seconds": 0.01}
+each error is {"file", "type", "message"}. The jobs of a connection run concurrently
+and their replies come in the order they finish.
+
+Each tool has its own pool of worker processes with the tool's directory on
+sys.path, since the projects have modules of the same name(Parser, BuildCache).
+A pool is restarted when the .py files of its tool change.'''
+
+import io
+import os
+import sys
+import glob
+import json
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import importlib
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+SOCKET = os.environ.get('N2T_DAEMON_SOCKET', f'/tmp/n2t-build-{os.getuid()}.sock')
+# tool -> (project directory, module)
+TOOLS = {'assembler': ('p6', 'Assembler'),
+         'vm': ('p8', 'VMtranslator'),
+         'analyzer': ('p10', 'JackAnalyzer'),
+         'compiler': ('p11', 'JackCompiler')}
+
+class BuildDaemon(object):
+    '''serve build jobs on a Unix domain socket
+    method: serve()
+    method: close()
+    '''
+
+    def __init__(self, path=SOCKET, jobs=None):
+        '''path: string socket file, replaced if it exists
+        jobs: worker processes of each tool, os.cpu_count() if None'''
+        self.__path = path
+        self.__jobs = jobs
+        self.__pools = {} # tool -> (ProcessPoolExecutor, version)
+
+    async def serve(self):
+        'load the tools and serve until cancelled or terminated'
+        if os.path.exists(self.__path):
+            os.unlink(self.__path)
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        await asyncio.gather(*(loop.run_in_executor(self.__pool(tool), _ready)
+                               for tool in TOOLS))
+        server = await asyncio.start_unix_server(self.__handle, self.__path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(self.__path):
+                os.unlink(self.__path)
+
+    def close(self):
+        'stop the worker processes'
+        for pool, _ in self.__pools.values():
+            pool.shutdown(cancel_futures=True)
+        self.__pools = {}
+
+    def __pool(self, tool):
+        'return: worker pool of tool, restarted if the tool has changed'
+        version = _version(tool)
+        pool = self.__pools.get(tool)
+        if pool is not None and pool[1] == version:
+            return pool[0]
+        if pool is not None:
+            pool[0].shutdown(wait=False)
+        # workers forked from the daemon itself would hold the sockets of the open
+        # connections, whose clients then never see the end of the replies, and the
+        # SIGTERM handler of the event loop, which a broken pool sends its workers
+        pool = ProcessPoolExecutor(self.__jobs, multiprocessing.get_context('forkserver'),
+                                   initializer=_load, initargs=(tool,))
+        self.__pools[tool] = pool, version
+        return pool
+
+    async def __handle(self, reader, writer):
+        'run the jobs of a connection, reply to each as soon as it is done'
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self.__reply(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def __reply(self, line, writer):
+        'run the job of line and write the reply'
+        job = {}
+        try:
+            job = json.loads(line)
+            tool, src, options = job['tool'], job['src'], job.get('options', {})
+            if tool not in TOOLS or not isinstance(src, str) or not isinstance(options, dict):
+                raise ValueError('job needs a tool in {} and a src'.format(', '.join(TOOLS)))
+        except (ValueError, KeyError, TypeError, AttributeError) as err:
+            job = job if isinstance(job, dict) else {}
+            reply = _reply(False, [_error('', 'BadRequest', err)])
+        else:
+            loop = asyncio.get_running_loop()
+            pool = self.__pool(tool)
+            try:
+                reply = await loop.run_in_executor(pool, build, tool, src, options)
+            except BrokenProcessPool as err: # a worker died, the next job gets a new pool
+                # other jobs of the broken pool may have replaced it already
+                if self.__pools.get(tool, (None, None))[0] is pool:
+                    del self.__pools[tool]
+                pool.shutdown(wait=False)
+                reply = _reply(False, [_error(src, 'WorkerError', err)])
+        reply['id'] = job.get('id')
+        writer.write((json.dumps(reply) + '\n').encode())
+        await writer.drain()
+
+def _version(tool):
+    'return: modification times of the .py files of tool'
+    directories = [TOOLS[tool][0]] + (['p10', 'p8', 'p6'] if tool == 'compiler' else [])
+    return tuple(os.stat(src).st_mtime_ns for directory in directories
+                 for src in sorted(glob.glob(os.path.join(ROOT, directory, '*.py'))))
+
+def _load(tool):
+    'import tool in a worker process'
+    sys.path.insert(0, os.path.join(ROOT, TOOLS[tool][0]))
+    importlib.import_module(TOOLS[tool][1])
+
+def _ready():
+    'return: True, once the initializer of the worker has run'
+    return True
+
+def _error(file, typ, message):
+    return {'file': file, 'type': typ, 'message': str(message)}
+
+def _reply(ok, errors, output='', seconds=0.0):
+    return {'ok': ok, 'errors': errors, 'output': output, 'seconds': seconds}
+
+def _gen(tool, module, src, options):
+    '''run tool on src with the options of its command line
+    return: list of (file, error) the tool reports without raising'''
+    if tool == 'assembler':
+        cache = module.BuildCache.from_env('Assembler')
+        asm = module.Assembler(src, cache, options.get('optimize', False))
+        if options.get('object'):
+            asm.gen_object()
+        else:
+            asm.preprocess().gen(options.get('binary', False), options.get('byteorder', 'big'))
+    elif tool == 'vm':
+        cache = module.BuildCache.from_env('VMtranslator')
+        module.VMtranslator(src, cache, 1, options.get('optimize', True),
+                            options.get('shared', False),
+                            options.get('mode', module.CodeWriter.COMMENT),
+                            options.get('hack', False), options.get('asm', True),
+                            init=options.get('init')).gen()
+    elif tool == 'analyzer':
+        cache = module.BuildCache.from_env('JackAnalyzer')
+        return module.JackAnalyzer(src, cache, options.get('stream', False), 1,
+                                   options.get('split', False),
+                                   options.get('compact', False)).gen()
+    else:
+        compiler = module.JackCompiler(src)
+        if options.get('asm'):
+            compiler.translate(options.get('os'), options.get('hack', False),
+                               options.get('shared', False))
+        else:
+            compiler.gen()
+    return []
+
+def build(tool, src, options):
+    '''run a job in a worker process, errors and sys.exit() of the tools become errors
+    of the reply instead of ending the process
+    return: dict of the reply'''
+    module = sys.modules[TOOLS[tool][1]]
+    output = io.StringIO()
+    begin = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            errors = [_error(file, type(err).__name__, err)
+                      for file, err in _gen(tool, module, src, options)]
+    except SystemExit: # the tools print the reason and exit on a bad input path
+        errors = [_error(src, 'SystemExit', output.getvalue().strip())]
+        output = io.StringIO()
+    except Exception as err: # the daemon outlives any failed build
+        errors = [_error(src, type(err).__name__, err)]
+    return _reply(not errors, errors, output.getvalue(), time.perf_counter() - begin)
+
+def request(jobs, path=SOCKET):
+    '''send jobs to a running daemon
+    jobs: list of dict of tool, src and options, src is made absolute
+    return: list of replies in the order of jobs'''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        lines = []
+        for i, job in enumerate(jobs):
+            job = dict(job, id=i, src=os.path.abspath(job['src']))
+            lines.append(json.dumps(job) + '\n')
+        sock.sendall(''.join(lines).encode())
+        sock.shutdown(socket.SHUT_WR)
+        replies = [None] * len(jobs)
+        with sock.makefile('r') as file:
+            for line in file:
+                reply = json.loads(line)
+                replies[reply['id']] = reply
+    return replies
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='build daemon of the toolchain')
+    argparser.add_argument('-s', '--socket', default=SOCKET,
+                           help='Unix domain socket, $N2T_DAEMON_SOCKET by default')
+    commands = argparser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='run the daemon')
+    serve.add_argument('-j', '--jobs', type=int, help='worker processes of each tool')
+    client = commands.add_parser('build', help='send a job to the daemon')
+    client.add_argument('tool', choices=list(TOOLS))
+    client.add_argument('src', nargs='+', help='sources, one job each')
+    client.add_argument('-o', '--option', action='append', default=[], metavar='NAME=JSON',
+                        help='tool option, e.g. shared=true or mode=\'"release"\'')
+    args = argparser.parse_args()
+
+    if args.command == 'serve':
+        daemon = BuildDaemon(args.socket, args.jobs)
+        try:
+            asyncio.run(daemon.serve())
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        finally:
+            daemon.close()
+        sys.exit()
+
+    options = {}
+    for option in args.option:
+        name, _, value = option.partition('=')
+        try:
+            options[name] = json.loads(value)
+        except ValueError:
+            options[name] = value
+    try:
+        replies = request([{'tool': args.tool, 'src': src, 'options': options}
+                           for src in args.src], args.socket)
+    except OSError as err:
+        print(f'cannot connect to the daemon at {args.socket}: {err}')
+        sys.exit(1)
+    for reply in replies:
+        sys.stdout.write(reply['output'])
+        for error in reply['errors']:
+            print('{}: {}: {}'.format(error['file'], error['type'], error['message']))
+    if not all(reply['ok'] for reply in replies):
+        sys.exit(1)
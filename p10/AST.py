@@ -0,0 +1,110 @@
+'''AST
+Nodes built by CompilationEngine, one class per grammar rule. Terminals are kept
+as Tokens(with line and column), punctuation implied by the grammar is not stored.
+A back end subclasses Visitor and defines visit_<NodeClass> methods, expressions nest
+without bound and are walked without recursion, see Visitor.walk().'''
+
+class Node(object):
+    'base of AST nodes, fields are given in __slots__ order, unset fields are None'
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        for name in self.__slots__:
+            setattr(self, name, None)
+        for name, value in zip(self.__slots__, args):
+            setattr(self, name, value)
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__,
+                               ', '.join(repr(getattr(self, x)) for x in self.__slots__))
+
+class Class(Node):
+    'name: Token, classVarDecs: [ClassVarDec], subroutineDecs: [SubroutineDec]'
+    __slots__ = ('name', 'classVarDecs', 'subroutineDecs')
+
+class ClassVarDec(Node):
+    "kind: Token 'static' | 'field', type: Token, names: [Token]"
+    __slots__ = ('kind', 'type', 'names')
+
+class SubroutineDec(Node):
+    "kind: Token 'constructor' | 'function' | 'method', type: Token, name: Token"
+    __slots__ = ('kind', 'type', 'name', 'parameterList', 'subroutineBody')
+
+class ParameterList(Node):
+    'parameters: [(type Token, name Token)]'
+    __slots__ = ('parameters',)
+
+class SubroutineBody(Node):
+    'varDecs: [VarDec], statements: Statements'
+    __slots__ = ('varDecs', 'statements')
+
+class VarDec(Node):
+    'type: Token, names: [Token]'
+    __slots__ = ('type', 'names')
+
+class Statements(Node):
+    'statements: [LetStatement | IfStatement | WhileStatement | DoStatement | ReturnStatement]'
+    __slots__ = ('statements',)
+
+class LetStatement(Node):
+    'name: Token, index: Expression or None, expression: Expression'
+    __slots__ = ('name', 'index', 'expression')
+
+class IfStatement(Node):
+    'condition: Expression, statements: Statements, elseStatements: Statements or None'
+    __slots__ = ('condition', 'statements', 'elseStatements')
+
+class WhileStatement(Node):
+    'condition: Expression, statements: Statements'
+    __slots__ = ('condition', 'statements')
+
+class DoStatement(Node):
+    'subroutineCall: SubroutineCall'
+    __slots__ = ('subroutineCall',)
+
+class ReturnStatement(Node):
+    'expression: Expression or None'
+    __slots__ = ('expression',)
+
+class Expression(Node):
+    'terms: [Term], ops: [Token], len(ops) == len(terms) - 1'
+    __slots__ = ('terms', 'ops')
+
+class Term(Node):
+    '''exactly one form is set:
+    token: Token constant | varName, with index: Expression for varName[index]
+    expression: Expression in parentheses
+    unaryOp: Token, with term: Term
+    subroutineCall: SubroutineCall'''
+    __slots__ = ('token', 'index', 'expression', 'unaryOp', 'term', 'subroutineCall')
+
+class SubroutineCall(Node):
+    'receiver: Token className | varName or None, name: Token'
+    __slots__ = ('receiver', 'name', 'expressionList')
+
+class ExpressionList(Node):
+    'expressions: [Expression]'
+    __slots__ = ('expressions',)
+
+class Visitor(object):
+    '''dispatch on node class
+    method: visit(node)
+    method: walk(node)'''
+
+    def visit(self, node):
+        'call visit_<NodeClass>(node)'
+        return getattr(self, 'visit_' + type(node).__name__)(node)
+
+    def walk(self, node):
+        '''visit node and its subtree with an explicit stack instead of recursion:
+        expand_<NodeClass>(node) does the work before the first child of node and
+        returns the rest in order, nodes to expand and (function, args...) to call'''
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            if type(item) is tuple:
+                item[0](*item[1:])
+            else:
+                stack.extend(reversed(getattr(self, 'expand_' + type(item).__name__)(item)))
@@ -39,321 +39,365 @@ KeywordConstant:  'true' | 'false' | 'null' | 'this'
 **omitted
 '''
 
-import collections
-from xml.sax.saxutils import escape
 from JackTokenizer import JackTokenizer, Token
+from XMLWriter import XMLWriter
+import AST
 
-TABSIZE = 2
 CLASSVARTYPE = ('static', 'field')
 TYPE_ = ('int', 'char', 'boolean')
 SUBROUTINETYPE = ('constructor', 'function', 'method')
 STATEMENT = ('let', 'if', 'while', 'do', 'return')
-OPERATOR = ('+', '-', '*', '/', '&', '|', '<', '>', '=')
+OPERATOR = frozenset(('+', '-', '*', '/', '&', '|', '<', '>', '='))
 KEYWORDCONST = ('true', 'false', 'null', 'this')
 UNARYOP = ('-', '~')
+# expected tokens, allocated once
 varName_token = Token(JackTokenizer.IDENTIFIER,'varName',1,1)
+class_token = Token(JackTokenizer.KEYWORD,'class',1,1)
+let_token = Token(JackTokenizer.KEYWORD,'let',1,1)
+if_token = Token(JackTokenizer.KEYWORD,'if',1,1)
+while_token = Token(JackTokenizer.KEYWORD,'while',1,1)
+do_token = Token(JackTokenizer.KEYWORD,'do',1,1)
+return_token = Token(JackTokenizer.KEYWORD,'return',1,1)
+lbrace_token = Token(JackTokenizer.SYMBOL,'{',1,1)
+rbrace_token = Token(JackTokenizer.SYMBOL,'}',1,1)
+lparen_token = Token(JackTokenizer.SYMBOL,'(',1,1)
+rparen_token = Token(JackTokenizer.SYMBOL,')',1,1)
+lbracket_token = Token(JackTokenizer.SYMBOL,'[',1,1)
+rbracket_token = Token(JackTokenizer.SYMBOL,']',1,1)
+semicolon_token = Token(JackTokenizer.SYMBOL,';',1,1)
+equal_token = Token(JackTokenizer.SYMBOL,'=',1,1)
+
+# first token of a term -> kind, looked up by value first, then by type
+T_CONST, T_NAME, T_PAREN, T_UNARY, T_ERROR = range(5)
+TERM_BY_VALUE = {'true': T_CONST, 'false': T_CONST, 'null': T_CONST, 'this': T_CONST,
+                 '-': T_UNARY, '~': T_UNARY, '(': T_PAREN}
+TERM_BY_TYPE = {JackTokenizer.INTEGER: T_CONST, JackTokenizer.STRING: T_CONST,
+                JackTokenizer.IDENTIFIER: T_NAME}
+# pending constructs of the expression parser
+F_UNARY, F_PAREN, F_INDEX, F_CALL = range(4)
 
 class CompilationEngine(object):
-    '''write tokens into file, only check the basic flow'''
+    '''parse tokens into an AST(see AST.py), only check the basic flow
+    method: parse(tokenizer)
+    method: parseSubroutineDecs(tokenizer)
+    method: compile(tokenizer, outfile, compact)
+    '''
 
     def __init__(self):
         self.__tokenizer = None
-        self.__indent = 0
 
-    def compile(self, tokenizer, outfile):
-        'complie the source file'
+    def parse(self, tokenizer):
+        '''parse the source file
+        return: AST.Class'''
+        self.__tokenizer = tokenizer
+        return self.compileClass()
+
+    def parseSubroutineDecs(self, tokenizer):
+        '''parse subroutineDec* up to the closing '}' of the class, for incremental parsing
+        return: list of AST.SubroutineDec'''
         self.__tokenizer = tokenizer
-        self.compileClass(outfile)
+        decs = self.CompileSubroutineDec()
+        self.__validate(rbrace_token, True)
+        return decs
+
+    def compile(self, tokenizer, outfile, compact=False):
+        '''complie the source file into xml
+        compact: xml without indentation or line breaks'''
+        XMLWriter(outfile, compact).visit(self.parse(tokenizer))
 
-    def compileClass(self, out):
+    def compileClass(self):
         'compile class'
-        self.__print_nonterm_tag(out, 'class') # <class>
-        self.__validate(out, Token(JackTokenizer.KEYWORD,'class',1,1), True)
-        self.__validate(out, varName_token)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'{',1,1), True)
-        self.CompileClassVarDec(out)
-        self.CompileSubroutineDec(out)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'}',1,1), True)
-        self.__print_nonterm_tag(out, 'class', True) # </class>
-
-    def CompileClassVarDec(self, out):
-        'compile classVarDec'
+        self.__validate(class_token, True)
+        name = self.__validate(varName_token)
+        self.__validate(lbrace_token, True)
+        classVarDecs = self.CompileClassVarDec()
+        subroutineDecs = self.CompileSubroutineDec()
+        self.__validate(rbrace_token, True)
+        return AST.Class(name, classVarDecs, subroutineDecs)
+
+    def CompileClassVarDec(self):
+        'compile classVarDec*'
+        decs = []
         token = self.__tokenizer.peek()
         while token.value in CLASSVARTYPE:
-            self.__print_nonterm_tag(out, 'classVarDec') # <classVarDec>
-            _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # 'static' | 'field'
-            self.CompileType(out)
-            self.__validate(out, varName_token)
+            kind = self.__tokenizer.next() # 'static' | 'field'
+            typ = self.CompileType()
+            names = self.__compile_names()
+            decs.append(AST.ClassVarDec(kind, typ, names))
             token = self.__tokenizer.peek()
-            while token.value == ',':
-                _ = self.__tokenizer.next()
-                self.__print_term_tag(out, token) # ,
-                self.__validate(out, varName_token)
-                token = self.__tokenizer.peek()
-            self.__validate(out, Token(JackTokenizer.SYMBOL,';',1,1), True)
-            self.__print_nonterm_tag(out, 'classVarDec', True) # </classVarDec>
+        return decs
+
+    def __compile_names(self):
+        "compile varName (',' varName)* ';'"
+        names = [self.__validate(varName_token)]
+        token = self.__tokenizer.peek()
+        while token.value == ',':
+            _ = self.__tokenizer.next()
+            names.append(self.__validate(varName_token))
             token = self.__tokenizer.peek()
+        self.__validate(semicolon_token, True)
+        return names
 
     def __is_type(self, token):
         return token.value in TYPE_ or token.typ == JackTokenizer.IDENTIFIER
 
-    def CompileType(self, out):
+    def CompileType(self):
         'compile type'
         token = self.__tokenizer.next()
         if token.value not in TYPE_ and token.typ != JackTokenizer.IDENTIFIER:
             self.__error_msg(token, '|'.join(TYPE_)+'|className')
-        self.__print_term_tag(out, token)
+        return token
 
-    def CompileSubroutineDec(self, out):
-        'compile subroutineDec'
+    def CompileSubroutineDec(self):
+        'compile subroutineDec*'
+        decs = []
         token = self.__tokenizer.peek()
         while token.value in SUBROUTINETYPE:
-            self.__print_nonterm_tag(out, 'subroutineDec') # <subroutineDec>
-            _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # 'constructor' | 'function' | 'method'
+            kind = self.__tokenizer.next() # 'constructor' | 'function' | 'method'
             token = self.__tokenizer.next()
             if token.value != 'void' and not self.__is_type(token):
                 self.__error_msg(token, 'void|'+ '|'.join(TYPE_) +'|className')
-            self.__print_term_tag(out, token) # 'void' | type
-            self.__validate(out, varName_token)
-            self.__validate(out, Token(JackTokenizer.SYMBOL,'(',1,1), True)
-            self.CompileParameterList(out)
-            self.__validate(out, Token(JackTokenizer.SYMBOL,')',1,1), True)
-            self.CompileSubroutineBody(out)
-            self.__print_nonterm_tag(out, 'subroutineDec', True) # </subroutineDec>
+            name = self.__validate(varName_token)
+            self.__validate(lparen_token, True)
+            parameterList = self.CompileParameterList()
+            self.__validate(rparen_token, True)
+            subroutineBody = self.CompileSubroutineBody()
+            decs.append(AST.SubroutineDec(kind, token, name, parameterList, subroutineBody))
             token = self.__tokenizer.peek()
+        return decs
 
-    def CompileParameterList(self, out):
+    def CompileParameterList(self):
         'compile parameterList'
-        self.__print_nonterm_tag(out, 'parameterList') # <parameterList>
+        parameters = []
         token = self.__tokenizer.peek()
         if not self.__is_type(token):
-            self.__print_nonterm_tag(out, 'parameterList', True) # </parameterList>
-            return
+            return AST.ParameterList(parameters)
         _ = self.__tokenizer.next()
-        self.__print_term_tag(out, token) # type
-        self.__validate(out, varName_token)
+        parameters.append((token, self.__validate(varName_token)))
         token = self.__tokenizer.peek()
         while token.value == ',':
             _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # ,
-            self.CompileType(out)
-            self.__validate(out, varName_token)
+            typ = self.CompileType()
+            parameters.append((typ, self.__validate(varName_token)))
             token = self.__tokenizer.peek()
-        self.__print_nonterm_tag(out, 'parameterList', True) # </parameterList>
+        return AST.ParameterList(parameters)
 
-    def CompileSubroutineBody(self, out):
+    def CompileSubroutineBody(self):
         'compile subroutineBody'
-        self.__print_nonterm_tag(out, 'subroutineBody') # <subroutineBody>
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'{',1,1), True)
-        self.CompileVarDec(out)
-        self.CompileStatements(out)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'}',1,1), True)
-        self.__print_nonterm_tag(out, 'subroutineBody', True) # </subroutineBody>
-
-    def CompileVarDec(self, out):
-        'compile varDec'
+        self.__validate(lbrace_token, True)
+        varDecs = self.CompileVarDec()
+        statements = self.CompileStatements()
+        self.__validate(rbrace_token, True)
+        return AST.SubroutineBody(varDecs, statements)
+
+    def CompileVarDec(self):
+        'compile varDec*'
+        decs = []
         token = self.__tokenizer.peek()
         while token.value == 'var':
-            self.__print_nonterm_tag(out, 'varDec') # <varDec>
             _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # 'var'
-            self.CompileType(out)
-            self.__validate(out, varName_token)
-            token = self.__tokenizer.peek()
-            while token.value == ',':
-                _ = self.__tokenizer.next()
-                self.__print_term_tag(out, token) # ,
-                self.__validate(out, varName_token)
-                token = self.__tokenizer.peek()
-            self.__validate(out, Token(JackTokenizer.SYMBOL,';',1,1), True)
-            self.__print_nonterm_tag(out, 'varDec', True) # </varDec>
+            typ = self.CompileType()
+            decs.append(AST.VarDec(typ, self.__compile_names()))
             token = self.__tokenizer.peek()
+        return decs
 
-    def CompileStatements(self, out):
+    def CompileStatements(self):
         'compile statements'
-        self.__print_nonterm_tag(out, 'statements') # <statements>
+        statements = []
         token = self.__tokenizer.peek()
         while token.value in STATEMENT:
-            if token.value == 'let': self.CompileLetStatement(out)
-            elif token.value == 'if': self.CompileIfStatement(out)
-            elif token.value == 'while': self.CompileWhileStatement(out)
-            elif token.value == 'do': self.CompileDoStatement(out)
-            elif token.value == 'return': self.CompileReturnStatement(out)
+            if token.value == 'let': statements.append(self.CompileLetStatement())
+            elif token.value == 'if': statements.append(self.CompileIfStatement())
+            elif token.value == 'while': statements.append(self.CompileWhileStatement())
+            elif token.value == 'do': statements.append(self.CompileDoStatement())
+            elif token.value == 'return': statements.append(self.CompileReturnStatement())
             token = self.__tokenizer.peek()
-        self.__print_nonterm_tag(out, 'statements', True) # </statements>
+        return AST.Statements(statements)
 
-    def CompileLetStatement(self, out):
+    def CompileLetStatement(self):
         'compile letStatement'
-        self.__print_nonterm_tag(out, 'letStatement') # <letStatement>
-        self.__validate(out, Token(JackTokenizer.KEYWORD,'let',1,1), True)
-        self.__validate(out, varName_token)
+        self.__validate(let_token, True)
+        name = self.__validate(varName_token)
+        index = None
         token = self.__tokenizer.peek()
         if token.value == '[':
             _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # [
-            self.CompileExpression(out)
-            self.__validate(out, Token(JackTokenizer.SYMBOL,']',1,1), True)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'=',1,1), True)
-        self.CompileExpression(out)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,';',1,1), True)
-        self.__print_nonterm_tag(out, 'letStatement', True) # </letStatement>
-
-    def CompileIfStatement(self, out):
+            index = self.CompileExpression()
+            self.__validate(rbracket_token, True)
+        self.__validate(equal_token, True)
+        expression = self.CompileExpression()
+        self.__validate(semicolon_token, True)
+        return AST.LetStatement(name, index, expression)
+
+    def CompileIfStatement(self):
         'compile ifStatement'
-        self.__print_nonterm_tag(out, 'ifStatement') # <ifStatement>
-        self.__validate(out, Token(JackTokenizer.KEYWORD,'if',1,1), True)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'(',1,1), True)
-        self.CompileExpression(out)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,')',1,1), True)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'{',1,1), True)
-        self.CompileStatements(out)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'}',1,1), True)
+        self.__validate(if_token, True)
+        condition, statements = self.__compile_block()
+        elseStatements = None
         token = self.__tokenizer.peek()
         if token.value == 'else':
             _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # 'else'
-            self.__validate(out, Token(JackTokenizer.SYMBOL,'{',1,1), True)
-            self.CompileStatements(out)
-            self.__validate(out, Token(JackTokenizer.SYMBOL,'}',1,1), True)
-        self.__print_nonterm_tag(out, 'ifStatement', True) # </ifStatement>
+            self.__validate(lbrace_token, True)
+            elseStatements = self.CompileStatements()
+            self.__validate(rbrace_token, True)
+        return AST.IfStatement(condition, statements, elseStatements)
 
-    def CompileWhileStatement(self, out):
+    def CompileWhileStatement(self):
         'compile whileStatement'
-        self.__print_nonterm_tag(out, 'whileStatement') # <whileStatement>
-        self.__validate(out, Token(JackTokenizer.KEYWORD,'while',1,1), True)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'(',1,1), True)
-        self.CompileExpression(out)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,')',1,1), True)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'{',1,1), True)
-        self.CompileStatements(out)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'}',1,1), True)
-        self.__print_nonterm_tag(out, 'whileStatement', True) # </whileStatement>
-
-    def CompileDoStatement(self, out):
+        self.__validate(while_token, True)
+        return AST.WhileStatement(*self.__compile_block())
+
+    def __compile_block(self):
+        "compile '(' expression ')' '{' statements '}'"
+        self.__validate(lparen_token, True)
+        condition = self.CompileExpression()
+        self.__validate(rparen_token, True)
+        self.__validate(lbrace_token, True)
+        statements = self.CompileStatements()
+        self.__validate(rbrace_token, True)
+        return condition, statements
+
+    def CompileDoStatement(self):
         'compile doStatement'
-        self.__print_nonterm_tag(out, 'doStatement') # <doStatement>
-        self.__validate(out, Token(JackTokenizer.KEYWORD,'do',1,1), True)
-        self.CompileSubroutineCall(out)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,';',1,1), True)
-        self.__print_nonterm_tag(out, 'doStatement', True) # </doStatement>
+        self.__validate(do_token, True)
+        subroutineCall = self.CompileSubroutineCall()
+        self.__validate(semicolon_token, True)
+        return AST.DoStatement(subroutineCall)
 
-    def CompileReturnStatement(self, out):
+    def CompileReturnStatement(self):
         'compile returnStatement'
-        self.__print_nonterm_tag(out, 'returnStatement') # <returnStatement>
-        self.__validate(out, Token(JackTokenizer.KEYWORD,'return',1,1), True)
+        self.__validate(return_token, True)
+        expression = None
         token = self.__tokenizer.peek()
         if token.value != ';':
-            self.CompileExpression(out)
-        self.__validate(out, Token(JackTokenizer.SYMBOL,';',1,1), True)
-        self.__print_nonterm_tag(out, 'returnStatement', True) # </returnStatement>
+            expression = self.CompileExpression()
+        self.__validate(semicolon_token, True)
+        return AST.ReturnStatement(expression)
 
-    def CompileExpression(self, out):
+    def CompileExpression(self):
         'compile expression'
-        self.__print_nonterm_tag(out, 'expression') # <expression>
-        self.CompileTerm(out)
-        token = self.__tokenizer.peek()
-        while token.value in OPERATOR:
-            _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # op
-            self.CompileTerm(out)
-            token = self.__tokenizer.peek()
-        self.__print_nonterm_tag(out, 'expression', True) # </expression>
+        return self.__compile_expression(False)
 
-    def CompileTerm(self, out):
+    def CompileTerm(self):
         'compile term'
-        self.__print_nonterm_tag(out, 'term') # <term>
-        token = self.__tokenizer.peek()
-        if token.typ in (JackTokenizer.INTEGER, JackTokenizer.STRING) \
-           or token.value in KEYWORDCONST:
-            _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # intConst | strConst | keywordConstant
-        elif token.value == '(':
-            _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # (
-            self.CompileExpression(out)
-            self.__validate(out, Token(JackTokenizer.SYMBOL,')',1,1), True)
-        elif token.value in UNARYOP:
-            _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # unaryOp
-            self.CompileTerm(out)
-        else:
-            token2 = self.__tokenizer.peek(1)
-            if token2.value in ('(', '.'):
-                self.CompileSubroutineCall(out)
-            else:
-                self.__validate(out, varName_token) # varName
-                token = self.__tokenizer.peek()
-                if token.value == '[':
-                    _ = self.__tokenizer.next()
-                    self.__print_term_tag(out, token) # [
-                    self.CompileExpression(out)
-                    self.__validate(out, Token(JackTokenizer.SYMBOL,']',1,1), True)
-        self.__print_nonterm_tag(out, 'term', True) # </term>
-
-    def CompileSubroutineCall(self, out):
+        return self.__compile_expression(True)
+
+    def __compile_expression(self, single_term):
+        '''compile expression, or only a term if single_term, without recursion:
+        unary operators, parentheses, array indexes and calls inside the expression
+        wait on an explicit stack for their inner term or expression
+        return: AST.Expression or AST.Term'''
+        tokenizer = self.__tokenizer
+        stack = [] # (F_*, ...) of pending constructs
+        terms, ops = [], [] # of the innermost expression
+        while True:
+            # prefix: read until a complete term
+            term = None
+            while term is None:
+                token = tokenizer.next()
+                kind = TERM_BY_VALUE.get(token.value)
+                if kind is None:
+                    kind = TERM_BY_TYPE.get(token.typ, T_ERROR)
+                if kind == T_CONST: # intConst | strConst | keywordConstant
+                    term = AST.Term(token)
+                elif kind == T_UNARY:
+                    stack.append((F_UNARY, token))
+                elif kind == T_PAREN:
+                    stack.append((F_PAREN, terms, ops))
+                    terms, ops = [], []
+                elif kind == T_NAME:
+                    value = tokenizer.peek().value
+                    if value == '[':
+                        _ = tokenizer.next()
+                        stack.append((F_INDEX, terms, ops, token))
+                        terms, ops = [], []
+                    elif value == '(' or value == '.':
+                        receiver, name = None, token
+                        if value == '.':
+                            _ = tokenizer.next()
+                            receiver, name = token, self.__validate(varName_token)
+                        self.__validate(lparen_token, True)
+                        if tokenizer.peek().value == ')':
+                            _ = tokenizer.next()
+                            term = AST.Term(subroutineCall=AST.SubroutineCall(
+                                receiver, name, AST.ExpressionList([])))
+                        else:
+                            stack.append((F_CALL, terms, ops, receiver, name, []))
+                            terms, ops = [], []
+                    else:
+                        term = AST.Term(token) # varName
+                else:
+                    self.__error_msg(token, 'type ' + varName_token.typ)
+            # infix: reduce finished constructs until an operator follows
+            while True:
+                while stack and stack[-1][0] == F_UNARY:
+                    term = AST.Term(unaryOp=stack.pop()[1], term=term)
+                if single_term and not stack:
+                    return term
+                terms.append(term)
+                token = tokenizer.peek()
+                if token.value in OPERATOR:
+                    ops.append(tokenizer.next())
+                    break
+                expression = AST.Expression(terms, ops)
+                if not stack:
+                    return expression
+                frame = stack.pop()
+                if frame[0] == F_CALL:
+                    frame[5].append(expression)
+                    if token.value == ',':
+                        _ = tokenizer.next()
+                        stack.append(frame)
+                        terms, ops = [], []
+                        break
+                    self.__validate(rparen_token, True)
+                    term = AST.Term(subroutineCall=AST.SubroutineCall(
+                        frame[3], frame[4], AST.ExpressionList(frame[5])))
+                elif frame[0] == F_INDEX:
+                    self.__validate(rbracket_token, True)
+                    term = AST.Term(frame[3], expression)
+                else: # F_PAREN
+                    self.__validate(rparen_token, True)
+                    term = AST.Term(expression=expression)
+                terms, ops = frame[1], frame[2]
+
+    def CompileSubroutineCall(self):
         'compile subroutineCall'
-        self.__validate(out, varName_token) # varName
+        receiver = None
+        name = self.__validate(varName_token) # varName
         token = self.__tokenizer.peek()
         if token.value == '.':
             _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # '.'
-            self.__validate(out, varName_token) # varName
-        self.__validate(out, Token(JackTokenizer.SYMBOL,'(',1,1), True)
-        token = self.__tokenizer.peek()
-        if token.value != ')':
-            self.CompileExpressionList(out)
-        else:
-            self.__print_nonterm_tag(out, 'expressionList') # <expressionList>
-            self.__print_nonterm_tag(out, 'expressionList', True) # </expressionList>
-        self.__validate(out, Token(JackTokenizer.SYMBOL,')',1,1), True)
-
-    def CompileExpressionList(self, out):
+            receiver, name = name, self.__validate(varName_token)
+        self.__validate(lparen_token, True)
+        expressionList = self.CompileExpressionList()
+        self.__validate(rparen_token, True)
+        return AST.SubroutineCall(receiver, name, expressionList)
+
+    def CompileExpressionList(self):
         'compile expressionList'
-        self.__print_nonterm_tag(out, 'expressionList') # <expressionList>
-        self.CompileExpression(out)
+        expressions = []
+        token = self.__tokenizer.peek()
+        if token.value == ')':
+            return AST.ExpressionList(expressions)
+        expressions.append(self.CompileExpression())
         token = self.__tokenizer.peek()
         while token.value == ',':
             _ = self.__tokenizer.next()
-            self.__print_term_tag(out, token) # ,
-            self.CompileExpression(out)
+            expressions.append(self.CompileExpression())
             token = self.__tokenizer.peek()
-        self.__print_nonterm_tag(out, 'expressionList', True) # </expressionList>
+        return AST.ExpressionList(expressions)
 
-    def __validate(self, out, require, value_match=False):
-        'fetch next token, compare with required token, and write to file'
+    def __validate(self, require, value_match=False):
+        '''fetch next token, compare with required token
+        return: the token'''
         get = self.__tokenizer.next()
         if get.typ != require.typ:
             self.__error_msg(get, 'type ' + require.typ)
         if value_match and get.value != require.value:
             self.__error_msg(get, 'value ' + f'{require.value!r}')
-        self.__print_term_tag(out, get)
-
-    def __print_nonterm_tag(self, out, name, post=False):
-        'write non-terminal tag'
-        if post:
-            self.__indent -= 1
-        out.write(' ' * self.__indent * TABSIZE)
-        out.write('<')
-        if post: out.write('/')
-        out.write(name +'>\n')
-        if not post:
-            self.__indent += 1
-
-    def __print_term_tag(self, out, token):
-        'write terminal tag'
-        out.write(' ' * self.__indent * TABSIZE)
-        out.write('<' + token.typ + '>')
-        value = token.value
-        if token.typ == JackTokenizer.STRING:
-            value = escape(token.value.strip('"'))
-        elif token.typ == JackTokenizer.SYMBOL:
-            value = escape(token.value)
-        out.write(' ' + value + ' ')
-        out.write('</' + token.typ + '>\n')
+        return get
 
     def __error_msg(self, token, msg):
         raise SyntaxError(f"line {token.line},{token.column}: require " + msg +\
                           f", get {token.value!r}({token.typ})")
-
@@ -1,16 +1,38 @@
 'JackAnalyzer'
 
+import io
 import sys
 import os
 import glob
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
 
+from BuildCache import BuildCache
 from JackTokenizer import JackTokenizer, Token
 from CompilationEngine import CompilationEngine
+from JackWatcher import JackWatcher
 
 class JackAnalyzer(object):
-    'JackAnalyzer'
+    '''JackAnalyzer
 
-    def __init__(self, file):
+    the files are analyzed in parallel, into one xml file or one xml file per class
+    method: gen()
+    '''
+
+    def __init__(self, file, cache=None, stream=False, jobs=None, split=False, compact=False):
+        '''file: string .jack file or directory
+        cache: BuildCache, unchanged .jack files reuse their cached xml
+        stream: tokenize lazily while parsing, see JackTokenizer
+        jobs: number of worker processes, os.cpu_count() if None
+        split: write Xxx.xml for each Xxx.jack instead of one xml file for the directory,
+        a file with errors does not stop the others
+        compact: xml without indentation or line breaks'''
+        self.__cache = cache
+        self.__stream = stream
+        self.__jobs = jobs
+        self.__split = split
+        self.__compact = compact
         if file.endswith('.jack') and os.path.isfile(file):
             self.__infilelist = [file]
             self.__outfilename = file[:-4] + 'xml'
@@ -24,20 +46,84 @@ class JackAnalyzer(object):
             if self.__infilelist == []:
                 print('no ".jack" file found in the given directory')
                 sys.exit()
-        self.__compileEngine = CompilationEngine()
 
     def gen(self):
-        '''generate xml file'''
-        with open(self.__outfilename, 'w') as outfile:
-            for infile in self.__infilelist:
-                tokenizer = JackTokenizer(infile)
-                self.__compileEngine.compile(tokenizer, outfile)
+        '''generate xml file
+        return: list of (file, error) of the failed files in split mode,
+        otherwise the first error is raised'''
+        results = self.__analyze()
+        if not self.__split:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+            with open(self.__outfilename, 'w') as outfile:
+                outfile.writelines(results)
+            return []
+        errors = []
+        for infile, result in zip(self.__infilelist, results):
+            if isinstance(result, Exception):
+                errors.append((infile, result))
+                continue
+            with open(infile[:-4] + 'xml', 'w') as outfile:
+                outfile.write(result)
+        return errors
+
+    def __analyze(self):
+        'return: xml string or error of each file'
+        keys = [None] * len(self.__infilelist)
+        results = [None] * len(self.__infilelist)
+        if self.__cache:
+            for i, infile in enumerate(self.__infilelist):
+                with open(infile, 'rb') as file:
+                    keys[i] = self.__cache.key(file.read(), str(self.__compact))
+                xml = self.__cache.get(keys[i])
+                if xml is not None:
+                    results[i] = xml.decode()
+        todo = [i for i, result in enumerate(results) if result is None]
+        infiles = [self.__infilelist[i] for i in todo]
+        task = functools.partial(analyze, stream=self.__stream, compact=self.__compact)
+        if len(infiles) > 1 and self.__jobs != 1:
+            with ProcessPoolExecutor(self.__jobs) as pool:
+                done = list(pool.map(task, infiles))
+        else:
+            done = list(map(task, infiles))
+        for i, result in zip(todo, done):
+            results[i] = result
+            if keys[i] and not isinstance(result, Exception):
+                self.__cache.put(keys[i], result.encode())
+        return results
+
+def analyze(infile, stream=False, compact=False):
+    '''analyze a .jack file on its own, runs in the worker processes
+    return: xml string, or the error raised by the file'''
+    fragment = io.StringIO()
+    try:
+        CompilationEngine().compile(JackTokenizer(infile, stream), fragment, compact)
+    except (SyntaxError, RuntimeError) as err: # RuntimeError: file ends too early
+        return err
+    return fragment.getvalue()
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python JackAnalyzer.py <file.jack|directory>")
+    argparser = argparse.ArgumentParser(description='analyze .jack files into xml')
+    argparser.add_argument('src', help='.jack file or directory')
+    argparser.add_argument('-j', '--jobs', type=int, help='number of worker processes')
+    argparser.add_argument('--stream', action='store_true', help='tokenize lazily while parsing')
+    argparser.add_argument('--split', action='store_true',
+                           help='write one xml file per class, errors do not stop other files')
+    argparser.add_argument('--compact', action='store_true',
+                           help='write xml without indentation or line breaks')
+    argparser.add_argument('--watch', action='store_true',
+                           help='keep running and rewrite Xxx.xml whenever Xxx.jack changes')
+    args = argparser.parse_args()
+
+    if args.watch:
+        JackWatcher(args.src, args.compact).watch()
         sys.exit()
 
-    src = sys.argv[1]
-    analyzer = JackAnalyzer(src)
-    analyzer.gen()
+    analyzer = JackAnalyzer(args.src, BuildCache.from_env('JackAnalyzer'), args.stream,
+                            args.jobs, args.split, args.compact)
+    errors = analyzer.gen()
+    for infile, err in errors:
+        print(f'{infile}: {err}')
+    if errors:
+        sys.exit(1)
@@ -17,12 +17,16 @@ digit.'''
 
 import re
 import sys
+import functools
 import collections
 
 Token = collections.namedtuple('Token', ['typ', 'value', 'line', 'column'])
 
 class JackTokenizer(object):
-    '''generate tokens, in the form of a namedtuple'''
+    '''generate tokens, in the form of a namedtuple
+    method: hasnext(), next(), peek(i)
+    method: mark(), rewind(mark)
+    '''
 
     KEYWORD = 'keyword'
     SYMBOL = 'symbol'
@@ -42,107 +46,139 @@ class JackTokenizer(object):
         ('skip',     r'\s+'),
         ('mismatch', r'.')
     ]
-    tok_regex = '|'.join('(?P<%s>%s)' % pair for pair in token_specification)
+    # comments are lexed like tokens, in one pass over the text
+    lex_specification = [
+        ('comment',      r'//[^\n]*|/\*(?s:.*?)\*/'),
+        ('comment_open', r'/\*'), # '*/' not found yet
+    ] + token_specification
+    lex_regex = re.compile('|'.join('(?P<%s>%s)' % pair for pair in lex_specification))
+    CHUNK = 1 << 16 # read size in stream mode
+    LOOKAHEAD = 64 # consumed tokens kept before the buffer is trimmed in stream mode
 
-    def __init__(self, src):
-        self.comment_single_p = re.compile(r'[^"]*?("[^"\n]*"[^"]*?)*?(?P<comment>//.*)$')
-        self.comment_multi_p = re.compile(r'[^"]*?("[^"\n]*"[^"]*?)*?(?P<comment>/\*.*?\*/)') # /*...*/
-        self.comment_multi_s = re.compile(r'[^"]*?("[^"\n]*"[^"]*?)*?(?P<comment>/\*)') # /*...$
-        self.comment_multi_e = re.compile(r'.*?(?P<comment>\*/)') # ^...*/
-        self.__line_num = 0 # line number
+    def __init__(self, src, stream=False, text=None, line=1, column=1):
+        '''src: string .jack file
+        stream: lex the file in chunks on demand and keep only a small token buffer,
+        instead of tokenizing the whole file up front
+        text: part of the contents of src to tokenize, src is not read if given
+        line, column: position of the first character of text in src'''
+        self.__pos = 0 # cursor, index of the next token
+        self.__base = 0 # index of self.__tokens[0]
+        self.__mark = None
+        if text is not None:
+            self.__lexer = None
+            self.__tokens = list(self.__lex(iter([text]), line, column))
+            return
         try:
-            with open(src, 'r') as file:
-                self.__lines = [x.rstrip() for x in file.readlines()]
+            file = open(src, 'r')
         except FileNotFoundError:
             print(f"python: can't open file {src!r}")
             sys.exit()
-        self.__remove_comment()
-        self.__tokens = list(self.__tokenize())
+        if stream:
+            self.__tokens = []
+            self.__lexer = self.__lex(self.__read(file))
+            return
+        self.__lexer = None
+        with file:
+            text = file.read()
+        self.__tokens = list(self.__lex(iter([text])))
 
     def hasnext(self):
         'return: True if has next token'
-        return self.__tokens != []
+        return self.__fill(0)
 
     def next(self):
-        'pop next token'
-        if self.__tokens == []:
+        'consume next token'
+        if not self.__fill(0):
             raise RuntimeError('need more tokens')
-        return self.__tokens.pop(0)
+        token = self.__tokens[self.__pos - self.__base]
+        self.__pos += 1
+        if self.__lexer is not None:
+            self.__trim()
+        return token
     
     def peek(self, i=0):
         'peek i-th token'
-        if i >= len(self.__tokens):
+        if not self.__fill(i):
             raise RuntimeError('need more tokens')
-        return self.__tokens[i]
+        return self.__tokens[self.__pos + i - self.__base]
 
-    def __remove_comment(self):
-        'pre-proccess'
-        ongoing = False
-        i = 0
-        while i < len(self.__lines):
-            if ongoing:
-                # multi-line comment continues, search for '*/'
-                is_match = self.comment_multi_e.match(self.__lines[i])
-                if is_match:
-                    end = is_match.end()
-                    self.__lines[i] = (' '*end + self.__lines[i][end:]).rstrip()
-                    ongoing = False
-                else:
-                    self.__lines[i] = ''
-                    i += 1
-                    continue
+    def mark(self):
+        '''return: current position, for rewind()
+        in stream mode only tokens after the latest mark are kept'''
+        self.__mark = self.__pos
+        return self.__pos
 
-            is_match = self.comment_multi_p.match(self.__lines[i])
-            # remove in-line /*comment*/
-            while is_match:
-                self.__lines[i] = (self.__lines[i][:is_match.start('comment')]
-                                   + ' '*(is_match.end('comment') - is_match.start('comment'))
-                                   + self.__lines[i][is_match.end('comment'):]) \
-                                  .rstrip()
-                is_match = self.comment_multi_p.match(self.__lines[i])
-            
-            is_match = self.comment_multi_s.match(self.__lines[i])
-            # remove /*comment
-            if is_match:
-                ongoing = True
-                self.__lines[i] = self.__lines[i][:is_match.start('comment')].rstrip()
-            
-            is_match = self.comment_single_p.match(self.__lines[i])
-            # remove //comment
-            if is_match:
-                ongoing = False
-                self.__lines[i] = self.__lines[i][:is_match.start('comment')].rstrip()
-            i += 1
-        if ongoing:
-            raise SyntaxError('/*comment*/ not end')
+    def rewind(self, mark):
+        'go back to a position returned by mark()'
+        if not self.__base <= mark <= self.__pos:
+            raise RuntimeError('invalid mark')
+        self.__pos = mark
+
+    def __fill(self, i):
+        'return: True if the i-th token after the cursor exists, lex it in stream mode'
+        while self.__pos + i >= self.__base + len(self.__tokens):
+            token = next(self.__lexer, None) if self.__lexer is not None else None
+            if token is None:
+                self.__lexer = None
+                return False
+            self.__tokens.append(token)
+        return True
 
-    def __tokenize(self):
-        '''yield: next token, in the form of a namedtuple'''
-        for line in self.__lines:
-            self.__line_num += 1
-            for mo in re.finditer(self.tok_regex, line):
+    def __trim(self):
+        'drop consumed tokens from the buffer, keep those after the mark'
+        keep = self.__pos if self.__mark is None else min(self.__mark, self.__pos)
+        if keep - self.__base >= self.LOOKAHEAD:
+            del self.__tokens[:keep - self.__base]
+            self.__base = keep
+
+    def __read(self, file):
+        'yield: chunks of the file'
+        with file:
+            yield from iter(functools.partial(file.read, self.CHUNK), '')
+
+    def __lex(self, chunks, line=1, column=1):
+        '''lex comments, strings and tokens in a single linear pass, only complete
+        lines are lexed until the last chunk is read
+        line, column: position of the first character
+        yield: next token, in the form of a namedtuple'''
+        buf = ''
+        pos = 0
+        line_start = 1 - column # offset of the first character of the line in buf
+        eof = False
+        while not eof:
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+            else:
+                buf = buf[pos:] + chunk
+                line_start -= pos
+                pos = 0
+            end = len(buf) if eof else buf.rfind('\n') + 1
+            while pos < end:
+                mo = self.lex_regex.match(buf, pos, end)
                 kind = mo.lastgroup
-                value = mo.group(kind)
-                if kind == 'skip':
-                    pass
-                elif kind == 'mismatch':
-                    raise SyntaxError(f'{value!r} unexpected on line {self.__line_num}')
+                value = mo.group()
+                if kind == 'comment_open':
+                    if eof:
+                        raise SyntaxError('/*comment*/ not end')
+                    break # read more
+                if kind == 'mismatch':
+                    raise SyntaxError(f'{value!r} unexpected on line {line}')
+                if kind == 'skip' or kind == 'comment':
+                    newline = value.rfind('\n')
+                    if newline >= 0:
+                        line += value.count('\n')
+                        line_start = pos + newline + 1
                 else:
                     if kind == self.IDENTIFIER and value in self.keywords:
                         kind = self.KEYWORD
-                    yield Token(kind, value, self.__line_num, mo.start()+1)
-    
-    # def print_text(self):
-    #     with open('outtext1.txt', 'w') as outfile:
-    #         outfile.writelines([x+'\n' for x in self.__lines])
+                    yield Token(kind, value, line, pos - line_start + 1)
+                pos = mo.end()
 
     # def print_token(self):
     #     with open('outtoken1.txt', 'w') as outfile:
     #         outfile.writelines([str(x)+'\n' for x in self.__tokens])
             
-# tokenizer = JackTokenizer('test1.txt')
-# tokenizer.print_text()
-
 # "/*in*/t"e"s/*in*/"t // "re"m"ov"e
 # t"e/*in*/in"s"t" /*re"//m//"o"/*in//v"e//*/ /*rem//ove*/ "re"ta"in" //rem/*??*/ove
 # "t/*in*/e""s///*in*/t"/* //haa
@@ -0,0 +1,248 @@
+'''JackWatcher
+Keep the parse tree and xml of every class of a directory in memory and rewrite
+Xxx.xml when Xxx.jack changes. An edit inside one subroutineDec re-lexes and
+re-parses only that subroutine, other edits re-analyze the whole file.'''
+
+import io
+import os
+import re
+import sys
+import glob
+import time
+import bisect
+
+import AST
+from JackTokenizer import JackTokenizer, Token
+from CompilationEngine import CompilationEngine, SUBROUTINETYPE
+from XMLWriter import XMLWriter
+
+class _Class(object):
+    '''analysis of a file
+    spans: [start, end, line, column, end line, end column] of each subroutineDec,
+    start and end are offsets in text, the end is right after its closing '}'
+    shifts: position moves not yet applied to the tokens of each subroutineDec
+    '''
+    __slots__ = ('text', 'tree', 'spans', 'shifts', 'header', 'xmls', 'footer')
+
+class JackWatcher(object):
+    '''re-analyze .jack files when they change
+    method: update(file)
+    method: tree(file)
+    method: poll()
+    method: watch(interval)
+    '''
+
+    def __init__(self, file, compact=False):
+        '''file: string .jack file or directory
+        compact: xml without indentation or line breaks'''
+        if file.endswith('.jack') and os.path.isfile(file):
+            self.__pattern = file
+        elif os.path.isdir(file):
+            self.__pattern = os.path.join(file, '*.jack')
+        else:
+            print('input should be a ".jack" file or a directory')
+            sys.exit()
+        self.__compact = compact
+        self.__engine = CompilationEngine()
+        self.__classes = {} # file -> _Class, None after an error
+        self.__stats = {} # file -> (mtime, size)
+
+    def poll(self):
+        '''update the files changed since the last poll
+        return: list of (file, message)'''
+        messages = []
+        infilelist = glob.glob(self.__pattern)
+        for infile in set(self.__stats) - set(infilelist): # removed
+            del self.__stats[infile]
+            self.__classes.pop(infile, None)
+        for infile in sorted(infilelist):
+            try:
+                stat = os.stat(infile)
+            except FileNotFoundError:
+                continue
+            if self.__stats.get(infile) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            self.__stats[infile] = (stat.st_mtime_ns, stat.st_size)
+            begin = time.perf_counter()
+            try:
+                message = self.update(infile)
+            except (SyntaxError, RuntimeError) as err:
+                message = str(err)
+            messages.append((infile, '{} ({:.1f} ms)'.format(message,
+                                                          (time.perf_counter() - begin) * 1000)))
+        return messages
+
+    def watch(self, interval=0.2):
+        'poll every interval seconds until interrupted'
+        try:
+            while True:
+                for infile, message in self.poll():
+                    print(f'{infile}: {message}')
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+    def tree(self, infile):
+        '''return: AST.Class of the last successful update of infile, None if it failed'''
+        analysis = self.__classes.get(infile)
+        if analysis is None:
+            return None
+        for dec, shifts in zip(analysis.tree.subroutineDecs, analysis.shifts):
+            for shift in shifts:
+                _shift(dec, *shift)
+            shifts.clear()
+        return analysis.tree
+
+    def update(self, infile):
+        '''re-analyze infile and write its xml file
+        return: string summary, raise SyntaxError or RuntimeError on errors'''
+        with open(infile, 'r') as file:
+            text = file.read()
+        analysis = self.__classes.get(infile)
+        self.__classes[infile] = None
+        if analysis is not None and analysis.text == text:
+            message = 'unchanged'
+        elif analysis is not None and self.__update_subroutine(infile, analysis, text):
+            message = 're-parsed 1 of {} subroutines'.format(len(analysis.spans))
+        else:
+            analysis = self.__analyze(infile, text)
+            message = 'analyzed'
+        self.__classes[infile] = analysis
+        with open(infile[:-4] + 'xml', 'w') as outfile:
+            outfile.write(analysis.header)
+            outfile.writelines(analysis.xmls)
+            outfile.write(analysis.footer)
+        return message
+
+    def __analyze(self, infile, text):
+        'return: _Class of the whole file'
+        tokenizer = JackTokenizer(infile, text=text)
+        tokens = []
+        while tokenizer.hasnext():
+            tokens.append(tokenizer.next())
+        tokenizer.rewind(0)
+        analysis = _Class()
+        analysis.text = text
+        analysis.tree = self.__engine.parse(tokenizer)
+        line_starts = [0] + [mo.end() for mo in re.finditer('\n', text)]
+        analysis.spans = []
+        depth, start = 0, None
+        for token in tokens:
+            if token.typ == JackTokenizer.SYMBOL and token.value == '{':
+                depth += 1
+            elif token.typ == JackTokenizer.SYMBOL and token.value == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+                if depth == 1 and start is not None:
+                    end = line_starts[token.line - 1] + token.column
+                    analysis.spans.append([line_starts[start.line - 1] + start.column - 1, end,
+                                           start.line, start.column, token.line, token.column + 1])
+                    start = None
+            elif depth == 1 and token.typ == JackTokenizer.KEYWORD and token.value in SUBROUTINETYPE:
+                start = token
+        analysis.header = self.__xml(analysis.tree, XMLWriter.beginClass)
+        analysis.xmls = [self.__xml(dec) for dec in analysis.tree.subroutineDecs]
+        analysis.shifts = [[] for dec in analysis.tree.subroutineDecs]
+        analysis.footer = self.__xml(None, XMLWriter.endClass)
+        return analysis
+
+    def __update_subroutine(self, infile, analysis, text):
+        '''re-parse the only subroutineDec changed in text
+        return: False if the change is not inside one subroutineDec'''
+        old = analysis.text
+        prefix = _common_prefix(old, text)
+        suffix = _common_prefix(old[::-1], text[::-1], min(len(old), len(text)) - prefix)
+        k = bisect.bisect_right([span[0] for span in analysis.spans], prefix) - 1
+        if k < 0 or len(old) - suffix > analysis.spans[k][1]:
+            return False
+        start, end, line, column, end_line, end_column = analysis.spans[k]
+        delta = len(text) - len(old)
+        region = text[start:end + delta]
+        if not region.endswith('}'):
+            return False
+        try:
+            # '}' of the class ends subroutineDec*
+            tokenizer = JackTokenizer(infile, text=region + '}', line=line, column=column)
+            tokens = []
+            while tokenizer.hasnext():
+                tokens.append(tokenizer.next())
+            tokenizer.rewind(0)
+            new_end_line = line + region.count('\n')
+            new_end_column = len(region) - region.rfind('\n') if '\n' in region \
+                             else column + len(region)
+            last = tokens[-2] if len(tokens) > 1 else None
+            if last is None or (last.line, last.column + 1) != (new_end_line, new_end_column):
+                return False # the region does not end with its own '}'
+            decs = self.__engine.parseSubroutineDecs(tokenizer)
+        except (SyntaxError, RuntimeError):
+            return False # may be valid in the whole file, e.g. an unclosed comment
+        if len(decs) != 1 or tokenizer.hasnext():
+            return False
+        dline, dcolumn = new_end_line - end_line, new_end_column - end_column
+        analysis.text = text
+        analysis.spans[k] = [start, end + delta, line, column, new_end_line, new_end_column]
+        analysis.tree.subroutineDecs[k] = decs[0]
+        analysis.xmls[k] = self.__xml(decs[0])
+        analysis.shifts[k] = []
+        for i in range(k + 1, len(analysis.spans)):
+            span = analysis.spans[i]
+            span[0] += delta
+            span[1] += delta
+            if dline or dcolumn:
+                span[2], span[3] = _move(span[2], span[3], end_line, dline, dcolumn)
+                span[4], span[5] = _move(span[4], span[5], end_line, dline, dcolumn)
+                analysis.shifts[i].append((end_line, dline, dcolumn)) # applied by tree()
+        return True
+
+    def __xml(self, node, write=XMLWriter.visit):
+        'return: xml of node, a subroutineDec if write is not given'
+        out = io.StringIO()
+        indent = 0 if write is XMLWriter.beginClass else 1
+        writer = XMLWriter(out, self.__compact, indent)
+        if node is None:
+            write(writer)
+        else:
+            write(writer, node)
+        writer.flush()
+        return out.getvalue()
+
+def _common_prefix(a, b, limit=None):
+    'return: length of the common prefix of a and b, at most limit'
+    lo, hi = 0, min(len(a), len(b)) if limit is None else limit
+    while lo < hi: # compare slices, a character loop is much slower
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _move(line, column, old_line, dline, dcolumn):
+    'return: position after an edit ending at old_line, which moved it by dline, dcolumn'
+    if line == old_line:
+        column += dcolumn
+    return line + dline, column
+
+def _shift(node, old_line, dline, dcolumn):
+    'move the positions of all tokens in node, see _move()'
+    def moved(token):
+        return token._replace(**dict(zip(('line', 'column'),
+                                         _move(token.line, token.column, old_line, dline, dcolumn))))
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        for name in node.__slots__:
+            value = getattr(node, name)
+            if isinstance(value, Token):
+                setattr(node, name, moved(value))
+            elif isinstance(value, AST.Node):
+                stack.append(value)
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    if isinstance(item, Token):
+                        value[i] = moved(item)
+                    elif isinstance(item, tuple): # (type, name) of parameterList
+                        value[i] = tuple(moved(x) for x in item)
+                    else:
+                        stack.append(item)
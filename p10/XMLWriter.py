@@ -0,0 +1,279 @@
+'''XMLWriter
+Write the AST of a class as the xml parse tree of the nand2tetris analyzer.'''
+
+from xml.sax.saxutils import escape
+from JackTokenizer import JackTokenizer
+from AST import Visitor
+
+TABSIZE = 2
+
+class XMLWriter(Visitor):
+    '''write AST nodes into file
+    method: visit(node)
+    method: beginClass(node), endClass()
+    method: flush()
+    '''
+
+    def __init__(self, out, compact=False, indent=0):
+        '''out: writable text file, written once per class
+        compact: no indentation or line breaks
+        indent: depth of the first node visited'''
+        self.__out = out
+        self.__buf = []
+        self.__indent = indent
+        self.__step = '' if compact else ' ' * TABSIZE
+        self.__eol = '' if compact else '\n'
+        self.__pads = ['']
+        self.__implied = {} # keyword or symbol -> tag
+
+    def flush(self):
+        'write the buffered xml to the file'
+        self.__out.write(''.join(self.__buf))
+        self.__buf = []
+
+    def visit_Class(self, node):
+        self.beginClass(node)
+        for dec in node.subroutineDecs:
+            self.visit(dec)
+        self.endClass()
+        self.flush()
+
+    def beginClass(self, node):
+        'write class up to its classVarDecs, the subroutineDecs may be written separately'
+        self.__print_nonterm_tag('class')
+        self.__print_keyword('class')
+        self.__print_term_tag(node.name)
+        self.__print_symbol('{')
+        for dec in node.classVarDecs:
+            self.visit(dec)
+
+    def endClass(self):
+        'write the end of class, after its subroutineDecs'
+        self.__print_symbol('}')
+        self.__print_nonterm_tag('class', True)
+
+    def visit_ClassVarDec(self, node):
+        self.__print_nonterm_tag('classVarDec')
+        self.__print_term_tag(node.kind)
+        self.__print_term_tag(node.type)
+        self.__print_names(node.names)
+        self.__print_nonterm_tag('classVarDec', True)
+
+    def visit_SubroutineDec(self, node):
+        self.__print_nonterm_tag('subroutineDec')
+        self.__print_term_tag(node.kind)
+        self.__print_term_tag(node.type)
+        self.__print_term_tag(node.name)
+        self.__print_symbol('(')
+        self.visit(node.parameterList)
+        self.__print_symbol(')')
+        self.visit(node.subroutineBody)
+        self.__print_nonterm_tag('subroutineDec', True)
+
+    def visit_ParameterList(self, node):
+        self.__print_nonterm_tag('parameterList')
+        for i, (typ, name) in enumerate(node.parameters):
+            if i:
+                self.__print_symbol(',')
+            self.__print_term_tag(typ)
+            self.__print_term_tag(name)
+        self.__print_nonterm_tag('parameterList', True)
+
+    def visit_SubroutineBody(self, node):
+        self.__print_nonterm_tag('subroutineBody')
+        self.__print_symbol('{')
+        for dec in node.varDecs:
+            self.visit(dec)
+        self.visit(node.statements)
+        self.__print_symbol('}')
+        self.__print_nonterm_tag('subroutineBody', True)
+
+    def visit_VarDec(self, node):
+        self.__print_nonterm_tag('varDec')
+        self.__print_keyword('var')
+        self.__print_term_tag(node.type)
+        self.__print_names(node.names)
+        self.__print_nonterm_tag('varDec', True)
+
+    def visit_Statements(self, node):
+        self.__print_nonterm_tag('statements')
+        for statement in node.statements:
+            self.visit(statement)
+        self.__print_nonterm_tag('statements', True)
+
+    def visit_LetStatement(self, node):
+        self.__print_nonterm_tag('letStatement')
+        self.__print_keyword('let')
+        self.__print_term_tag(node.name)
+        if node.index is not None:
+            self.__print_symbol('[')
+            self.visit(node.index)
+            self.__print_symbol(']')
+        self.__print_symbol('=')
+        self.visit(node.expression)
+        self.__print_symbol(';')
+        self.__print_nonterm_tag('letStatement', True)
+
+    def visit_IfStatement(self, node):
+        self.__print_nonterm_tag('ifStatement')
+        self.__print_keyword('if')
+        self.__print_block(node.condition, node.statements)
+        if node.elseStatements is not None:
+            self.__print_keyword('else')
+            self.__print_symbol('{')
+            self.visit(node.elseStatements)
+            self.__print_symbol('}')
+        self.__print_nonterm_tag('ifStatement', True)
+
+    def visit_WhileStatement(self, node):
+        self.__print_nonterm_tag('whileStatement')
+        self.__print_keyword('while')
+        self.__print_block(node.condition, node.statements)
+        self.__print_nonterm_tag('whileStatement', True)
+
+    def visit_DoStatement(self, node):
+        self.__print_nonterm_tag('doStatement')
+        self.__print_keyword('do')
+        self.visit(node.subroutineCall)
+        self.__print_symbol(';')
+        self.__print_nonterm_tag('doStatement', True)
+
+    def visit_ReturnStatement(self, node):
+        self.__print_nonterm_tag('returnStatement')
+        self.__print_keyword('return')
+        if node.expression is not None:
+            self.visit(node.expression)
+        self.__print_symbol(';')
+        self.__print_nonterm_tag('returnStatement', True)
+
+    def visit_Expression(self, node):
+        'write an expression, a term, a call or an expressionList, see Visitor.walk()'
+        self.walk(node)
+
+    visit_Term = visit_SubroutineCall = visit_ExpressionList = visit_Expression
+
+    def expand_Expression(self, node):
+        self.__print_nonterm_tag('expression')
+        terms = iter(node.terms)
+        ops = iter(node.ops)
+        # the leading constants and variables are written at once, the rest waits
+        # for the first term with a subtree
+        for term in terms:
+            if not self.__print_leaf(term):
+                rest = [term]
+                break
+            op = next(ops, None)
+            if op is not None:
+                self.__print_term_tag(op)
+        else:
+            rest = []
+        for op, term in zip(ops, terms):
+            rest.append((self.__print_term_tag, op))
+            rest.append(term)
+        rest.append((self.__print_nonterm_tag, 'expression', True))
+        return rest
+
+    def expand_Term(self, node):
+        self.__print_nonterm_tag('term')
+        if node.subroutineCall is not None:
+            rest = [node.subroutineCall]
+        elif node.expression is not None:
+            self.__print_symbol('(')
+            rest = [node.expression, (self.__print_symbol, ')')]
+        elif node.unaryOp is not None:
+            self.__print_term_tag(node.unaryOp)
+            rest = [node.term]
+        else:
+            self.__print_term_tag(node.token)
+            rest = []
+            if node.index is not None:
+                self.__print_symbol('[')
+                rest = [node.index, (self.__print_symbol, ']')]
+        rest.append((self.__print_nonterm_tag, 'term', True))
+        return rest
+
+    def expand_SubroutineCall(self, node):
+        # no tag of its own
+        if node.receiver is not None:
+            self.__print_term_tag(node.receiver)
+            self.__print_symbol('.')
+        self.__print_term_tag(node.name)
+        self.__print_symbol('(')
+        return [node.expressionList, (self.__print_symbol, ')')]
+
+    def expand_ExpressionList(self, node):
+        self.__print_nonterm_tag('expressionList')
+        rest = []
+        for i, expression in enumerate(node.expressions):
+            if i:
+                rest.append((self.__print_symbol, ','))
+            rest.append(expression)
+        rest.append((self.__print_nonterm_tag, 'expressionList', True))
+        return rest
+
+    def __print_leaf(self, term):
+        'write term if it is a constant or a variable, return: True if written'
+        if term.token is None or term.index is not None:
+            return False
+        self.__print_nonterm_tag('term')
+        self.__print_term_tag(term.token)
+        self.__print_nonterm_tag('term', True)
+        return True
+
+    def __print_block(self, condition, statements):
+        "write '(' expression ')' '{' statements '}'"
+        self.__print_symbol('(')
+        self.visit(condition)
+        self.__print_symbol(')')
+        self.__print_symbol('{')
+        self.visit(statements)
+        self.__print_symbol('}')
+
+    def __print_names(self, names):
+        "write varName (',' varName)* ';'"
+        for i, name in enumerate(names):
+            if i:
+                self.__print_symbol(',')
+            self.__print_term_tag(name)
+        self.__print_symbol(';')
+
+    def __print_nonterm_tag(self, name, post=False):
+        'write non-terminal tag'
+        if post:
+            self.__indent -= 1
+            self.__buf.append(f'{self.__pad(self.__indent)}</{name}>{self.__eol}')
+        else:
+            self.__buf.append(f'{self.__pad(self.__indent)}<{name}>{self.__eol}')
+            self.__indent += 1
+
+    def __print_keyword(self, value):
+        'write keyword implied by the grammar'
+        self.__print_implied(JackTokenizer.KEYWORD, value)
+
+    def __print_symbol(self, value):
+        'write symbol implied by the grammar'
+        self.__print_implied(JackTokenizer.SYMBOL, value)
+
+    def __print_implied(self, typ, value):
+        tag = self.__implied.get(value)
+        if tag is None:
+            tag = self.__implied[value] = self.__tag(typ, escape(value))
+        self.__buf.append(self.__pad(self.__indent) + tag)
+
+    def __print_term_tag(self, token):
+        'write terminal tag'
+        value = token.value
+        if token.typ == JackTokenizer.STRING:
+            value = escape(token.value.strip('"'))
+        elif token.typ == JackTokenizer.SYMBOL:
+            value = escape(token.value)
+        self.__buf.append(self.__pad(self.__indent) + self.__tag(token.typ, value))
+
+    def __tag(self, typ, value):
+        return f'<{typ}> {value} </{typ}>{self.__eol}'
+
+    def __pad(self, indent):
+        'return: indent string, computed once per depth'
+        while indent >= len(self.__pads):
+            self.__pads.append(self.__pads[-1] + self.__step)
+        return self.__pads[indent]
@@ -0,0 +1,53 @@
+'tests of JackAnalyzer on expressions nested deeper than the recursion limit'
+
+import os
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from JackAnalyzer import JackAnalyzer
+
+DEPTH = 5000 # well past sys.getrecursionlimit()
+
+EXPRESSIONS = {'parentheses': '(' * DEPTH + 'x' + ')' * DEPTH,
+               'unary': '-~' * DEPTH + 'x',
+               'call': 'Main.f(' * DEPTH + 'x' + ')' * DEPTH,
+               'index': 'a[' * DEPTH + 'x' + ']' * DEPTH}
+
+def deep_class(expression):
+    return ('class Main {\n  function int f(int x) {\n    var Array a;\n'
+            f'    return {expression} + 1;\n  }}\n}}\n')
+
+class TestDeepExpressions(unittest.TestCase):
+
+    def analyze(self, expression):
+        '''return: xml of the analyzed class, compact since the indentation of
+        indented xml grows with the depth'''
+        with tempfile.TemporaryDirectory() as directory:
+            infile = os.path.join(directory, 'Main.jack')
+            with open(infile, 'w') as file:
+                file.write(deep_class(expression))
+            JackAnalyzer(infile, jobs=1, compact=True).gen()
+            with open(infile[:-4] + 'xml') as file:
+                return file.read()
+
+    def test_parentheses(self):
+        xml = self.analyze(EXPRESSIONS['parentheses'])
+        self.assertEqual(xml.count('<expression>'), DEPTH + 1)
+        self.assertEqual(xml.count('<symbol> ( </symbol>'), DEPTH + 1)
+
+    def test_unary(self):
+        xml = self.analyze(EXPRESSIONS['unary'])
+        self.assertEqual(xml.count('<term>'), 2 * DEPTH + 2)
+
+    def test_call(self):
+        xml = self.analyze(EXPRESSIONS['call'])
+        self.assertEqual(xml.count('<expressionList>'), DEPTH)
+
+    def test_index(self):
+        xml = self.analyze(EXPRESSIONS['index'])
+        self.assertEqual(xml.count('<symbol> [ </symbol>'), DEPTH)
+        self.assertEqual(xml.count('</expression>'), xml.count('<expression>'))
+
+if __name__ == '__main__':
+    unittest.main()
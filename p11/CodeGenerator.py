@@ -0,0 +1,240 @@
+'''CodeGenerator
+Generate VM code from the AST of a class(see p10/AST.py), following the code
+layout of the nand2tetris JackCompiler.'''
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'p10'))
+from JackTokenizer import JackTokenizer
+from AST import Visitor
+from SymbolTable import SymbolTable
+from VMWriter import VMWriter
+
+class CodeGenerator(Visitor):
+    '''VM code back end
+    method: generate(node)
+    '''
+    segment = {SymbolTable.STATIC: VMWriter.STATIC, SymbolTable.FIELD: VMWriter.THIS,
+               SymbolTable.ARG: VMWriter.ARG, SymbolTable.VAR: VMWriter.LOCAL}
+    operator = {'+': 'add', '-': 'sub', '&': 'and', '|': 'or',
+                '<': 'lt', '>': 'gt', '=': 'eq'}
+    operator_call = {'*': 'Math.multiply', '/': 'Math.divide'}
+    unary = {'-': 'neg', '~': 'not'}
+    MAX_INT = 32767
+
+    def __init__(self):
+        self.__symbols = None
+        self.__writer = None
+        self.__classname = None
+        self.__if_count = 0
+        self.__while_count = 0
+
+    def generate(self, node):
+        '''node: AST.Class
+        return: list of VM commands
+        raise: SyntaxError on semantic errors, e.g. undefined variable'''
+        self.__symbols = SymbolTable()
+        self.__writer = VMWriter()
+        self.visit(node)
+        return self.__writer.lines()
+
+    def visit_Class(self, node):
+        self.__classname = node.name.value
+        for dec in node.classVarDecs:
+            self.visit(dec)
+        for dec in node.subroutineDecs:
+            self.visit(dec)
+
+    def visit_ClassVarDec(self, node):
+        for name in node.names:
+            self.__define(name, node.type.value, node.kind.value)
+
+    def visit_SubroutineDec(self, node):
+        symbols, writer = self.__symbols, self.__writer
+        symbols.startSubroutine()
+        self.__if_count = 0
+        self.__while_count = 0
+        if node.kind.value == 'method':
+            symbols.define('this', self.__classname, SymbolTable.ARG)
+        for typ, name in node.parameterList.parameters:
+            self.__define(name, typ.value, SymbolTable.ARG)
+        for dec in node.subroutineBody.varDecs:
+            self.visit(dec)
+        writer.writeFunction(f'{self.__classname}.{node.name.value}',
+                             symbols.varCount(SymbolTable.VAR))
+        if node.kind.value == 'constructor':
+            writer.writePush(VMWriter.CONST, symbols.varCount(SymbolTable.FIELD))
+            writer.writeCall('Memory.alloc', 1)
+            writer.writePop(VMWriter.POINTER, 0)
+        elif node.kind.value == 'method':
+            writer.writePush(VMWriter.ARG, 0)
+            writer.writePop(VMWriter.POINTER, 0)
+        self.visit(node.subroutineBody.statements)
+
+    def visit_VarDec(self, node):
+        for name in node.names:
+            self.__define(name, node.type.value, SymbolTable.VAR)
+
+    def visit_Statements(self, node):
+        for statement in node.statements:
+            self.visit(statement)
+
+    def visit_LetStatement(self, node):
+        writer = self.__writer
+        if node.index is None:
+            self.visit(node.expression)
+            self.__pop_var(node.name)
+            return
+        self.visit(node.index)
+        self.__push_var(node.name)
+        writer.writeArithmetic('add')
+        self.visit(node.expression)
+        writer.writePop(VMWriter.TEMP, 0)
+        writer.writePop(VMWriter.POINTER, 1)
+        writer.writePush(VMWriter.TEMP, 0)
+        writer.writePop(VMWriter.THAT, 0)
+
+    def visit_IfStatement(self, node):
+        writer = self.__writer
+        count = self.__if_count
+        self.__if_count += 1
+        self.visit(node.condition)
+        writer.writeIf(f'IF_TRUE{count}')
+        writer.writeGoto(f'IF_FALSE{count}')
+        writer.writeLabel(f'IF_TRUE{count}')
+        self.visit(node.statements)
+        if node.elseStatements is None:
+            writer.writeLabel(f'IF_FALSE{count}')
+            return
+        writer.writeGoto(f'IF_END{count}')
+        writer.writeLabel(f'IF_FALSE{count}')
+        self.visit(node.elseStatements)
+        writer.writeLabel(f'IF_END{count}')
+
+    def visit_WhileStatement(self, node):
+        writer = self.__writer
+        count = self.__while_count
+        self.__while_count += 1
+        writer.writeLabel(f'WHILE_EXP{count}')
+        self.visit(node.condition)
+        writer.writeArithmetic('not')
+        writer.writeIf(f'WHILE_END{count}')
+        self.visit(node.statements)
+        writer.writeGoto(f'WHILE_EXP{count}')
+        writer.writeLabel(f'WHILE_END{count}')
+
+    def visit_DoStatement(self, node):
+        self.visit(node.subroutineCall)
+        self.__writer.writePop(VMWriter.TEMP, 0)
+
+    def visit_ReturnStatement(self, node):
+        if node.expression is None:
+            self.__writer.writePush(VMWriter.CONST, 0)
+        else:
+            self.visit(node.expression)
+        self.__writer.writeReturn()
+
+    def visit_Expression(self, node):
+        'generate an expression, a term, a call or an expressionList, see Visitor.walk()'
+        self.walk(node)
+
+    visit_Term = visit_SubroutineCall = visit_ExpressionList = visit_Expression
+
+    def expand_Expression(self, node):
+        # the terms are generated at once up to the first term with a subtree
+        rest = []
+        for i, term in enumerate(node.terms):
+            op = self.__operator(node.ops[i - 1]) if i else None
+            if rest or term.token is None or term.index is not None:
+                rest.append(term)
+                if op:
+                    rest.append(op)
+            else:
+                self.__push_constant(term.token)
+                if op:
+                    op[0](*op[1:])
+        return rest
+
+    def __operator(self, op):
+        'return: (function, args...) generating the binary operator op'
+        if op.value in self.operator_call:
+            return self.__writer.writeCall, self.operator_call[op.value], 2
+        return self.__writer.writeArithmetic, self.operator[op.value]
+
+    def expand_Term(self, node):
+        writer = self.__writer
+        if node.subroutineCall is not None:
+            return [node.subroutineCall]
+        elif node.expression is not None:
+            return [node.expression]
+        elif node.unaryOp is not None:
+            return [node.term, (writer.writeArithmetic, self.unary[node.unaryOp.value])]
+        elif node.index is not None:
+            return [node.index, (self.__push_var, node.token), (writer.writeArithmetic, 'add'),
+                    (writer.writePop, VMWriter.POINTER, 1), (writer.writePush, VMWriter.THAT, 0)]
+        self.__push_constant(node.token)
+        return []
+
+    def expand_SubroutineCall(self, node):
+        writer = self.__writer
+        nArgs = len(node.expressionList.expressions)
+        if node.receiver is None: # method of this object
+            writer.writePush(VMWriter.POINTER, 0)
+            name = f'{self.__classname}.{node.name.value}'
+            nArgs += 1
+        elif self.__symbols.lookup(node.receiver.value) is not None: # method of a variable
+            self.__push_var(node.receiver)
+            name = f'{self.__symbols.typeOf(node.receiver.value)}.{node.name.value}'
+            nArgs += 1
+        else: # function or constructor of a class
+            name = f'{node.receiver.value}.{node.name.value}'
+        return [node.expressionList, (writer.writeCall, name, nArgs)]
+
+    def expand_ExpressionList(self, node):
+        return node.expressions
+
+    def __push_constant(self, token):
+        'push integer, string or keyword constant, or variable'
+        writer = self.__writer
+        if token.typ == JackTokenizer.INTEGER:
+            if int(token.value) > self.MAX_INT:
+                self.__error_msg(token, 'integer constant out of range')
+            writer.writePush(VMWriter.CONST, int(token.value))
+        elif token.typ == JackTokenizer.STRING:
+            value = token.value[1:-1]
+            writer.writePush(VMWriter.CONST, len(value))
+            writer.writeCall('String.new', 1)
+            for char in value:
+                writer.writePush(VMWriter.CONST, ord(char))
+                writer.writeCall('String.appendChar', 2)
+        elif token.value == 'true':
+            writer.writePush(VMWriter.CONST, 0)
+            writer.writeArithmetic('not')
+        elif token.value in ('false', 'null'):
+            writer.writePush(VMWriter.CONST, 0)
+        elif token.value == 'this':
+            writer.writePush(VMWriter.POINTER, 0)
+        else:
+            self.__push_var(token)
+
+    def __define(self, token, typ, kind):
+        try:
+            self.__symbols.define(token.value, typ, kind)
+        except SyntaxError as err:
+            self.__error_msg(token, err.msg)
+
+    def __push_var(self, token):
+        self.__writer.writePush(*self.__var(token))
+
+    def __pop_var(self, token):
+        self.__writer.writePop(*self.__var(token))
+
+    def __var(self, token):
+        'return: (segment, index) of variable'
+        symbol = self.__symbols.lookup(token.value)
+        if symbol is None:
+            self.__error_msg(token, f'{token.value!r} is not defined')
+        return self.segment[symbol.kind], symbol.index
+
+    def __error_msg(self, token, msg):
+        raise SyntaxError(f"line {token.line},{token.column}: " + msg)
@@ -0,0 +1,84 @@
+'JackCompiler: compile .jack files to .vm files'
+
+import os
+import sys
+import glob
+import argparse
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'p10'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'p8'))
+from JackTokenizer import JackTokenizer
+from CompilationEngine import CompilationEngine
+from CodeGenerator import CodeGenerator
+from VMtranslator import VMtranslator # p8 translator, for in-memory .asm output
+
+class JackCompiler(object):
+    '''compile .jack files, each class into its own .vm file
+    method: gen()
+    method: sources()
+    method: translate(os_dir, hack, shared)
+    '''
+
+    def __init__(self, file):
+        'file: string .jack file or directory'
+        if file.endswith('.jack') and os.path.isfile(file):
+            self.__infilelist = [file]
+        else:
+            if not os.path.isdir(file):
+                print('input should be a ".jack" file or a directory')
+                sys.exit()
+            self.__infilelist = sorted(glob.glob(os.path.join(file, '*.jack')))
+            if self.__infilelist == []:
+                print('no ".jack" file found in the given directory')
+                sys.exit()
+        self.__file = file
+        self.__sources = None
+
+    def sources(self):
+        '''compile all classes in memory
+        return: dict of .vm file name -> list of lines'''
+        if self.__sources is None:
+            engine = CompilationEngine()
+            self.__sources = {}
+            for infile in self.__infilelist:
+                tree = engine.parse(JackTokenizer(infile))
+                lines = CodeGenerator().generate(tree)
+                self.__sources[infile[:-4] + 'vm'] = [line + '\n' for line in lines]
+        return self.__sources
+
+    def gen(self):
+        'write .vm files'
+        for outfilename, lines in self.sources().items():
+            with open(outfilename, 'w') as outfile:
+                outfile.writelines(lines)
+
+    def translate(self, os_dir=None, hack=False, shared=False):
+        '''translate the compiled classes to a .asm file without writing .vm files
+        os_dir: directory of .vm files linked with the program, e.g. the OS
+        hack: also write the .hack file
+        shared: see VMtranslator, needed for a program with the whole OS to fit in ROM'''
+        sources = dict(self.sources())
+        if os_dir:
+            for infile in sorted(glob.glob(os.path.join(os_dir, '*.vm'))):
+                name = os.path.join(os.path.dirname(self.__infilelist[0]), os.path.basename(infile))
+                if name not in sources: # classes of the program replace those of the OS
+                    with open(infile, 'r') as file:
+                        sources[name] = file.readlines()
+        name = self.__file[:-4] + 'vm' if self.__file.endswith('.jack') else self.__file
+        VMtranslator(name, shared=shared, hack=hack, sources=sources).gen()
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='compile .jack files to .vm files')
+    argparser.add_argument('src', help='.jack file or directory')
+    argparser.add_argument('--asm', action='store_true',
+                           help='translate to a .asm file in memory instead of writing .vm files')
+    argparser.add_argument('--hack', action='store_true', help='with --asm, also write the .hack file')
+    argparser.add_argument('--os', metavar='DIR', help='with --asm, link the .vm files in DIR')
+    argparser.add_argument('--shared', action='store_true',
+                           help='with --asm, use shared call/return/compare subroutines')
+    args = argparser.parse_args()
+
+    compiler = JackCompiler(args.src)
+    if args.asm:
+        compiler.translate(args.os, args.hack, args.shared)
+    else:
+        compiler.gen()
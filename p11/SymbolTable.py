@@ -0,0 +1,64 @@
+'''SymbolTable
+Class scope: static and field variables, subroutine scope: arguments and local
+variables. Each kind is indexed from 0 in the order of definition.'''
+
+import collections
+
+Symbol = collections.namedtuple('Symbol', ['type', 'kind', 'index'])
+
+class SymbolTable(object):
+    '''symbol table of a class and its current subroutine
+    method: startSubroutine()
+    method: define(name, type, kind)
+    method: varCount(kind)
+    method: kindOf(name), typeOf(name), indexOf(name)
+    '''
+    STATIC = 'static'
+    FIELD = 'field'
+    ARG = 'arg'
+    VAR = 'var'
+    class_kinds = (STATIC, FIELD)
+
+    def __init__(self):
+        self.__class_scope = {}
+        self.__subroutine_scope = {}
+        self.__count = dict.fromkeys((self.STATIC, self.FIELD, self.ARG, self.VAR), 0)
+
+    def startSubroutine(self):
+        'start a new subroutine scope'
+        self.__subroutine_scope = {}
+        self.__count[self.ARG] = 0
+        self.__count[self.VAR] = 0
+
+    def define(self, name, typ, kind):
+        '''define a new identifier, static and field have class scope
+        raise: SyntaxError if name is already defined in the scope'''
+        scope = self.__class_scope if kind in self.class_kinds else self.__subroutine_scope
+        if name in scope:
+            raise SyntaxError(f'{name!r} is already defined')
+        scope[name] = Symbol(typ, kind, self.__count[kind])
+        self.__count[kind] += 1
+
+    def varCount(self, kind):
+        'return: number of variables of kind defined in the current scope'
+        return self.__count[kind]
+
+    def lookup(self, name):
+        'return: Symbol of name, subroutine scope first, None if not defined'
+        symbol = self.__subroutine_scope.get(name)
+        if symbol is None:
+            symbol = self.__class_scope.get(name)
+        return symbol
+
+    def kindOf(self, name):
+        'return: kind of name, None if not defined'
+        symbol = self.lookup(name)
+        return symbol and symbol.kind
+
+    def typeOf(self, name):
+        'return: type of name'
+        return self.lookup(name).type
+
+    def indexOf(self, name):
+        'return: index of name'
+        return self.lookup(name).index
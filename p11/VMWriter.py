@@ -0,0 +1,54 @@
+'''VMWriter
+Collect VM commands of a class as lines of text.'''
+
+class VMWriter(object):
+    '''write VM commands
+    method: writePush(segment, index), writePop(segment, index)
+    method: writeArithmetic(command)
+    method: writeLabel(label), writeGoto(label), writeIf(label)
+    method: writeCall(name, nArgs), writeFunction(name, nLocals), writeReturn()
+    method: lines()
+    '''
+    CONST = 'constant'
+    ARG = 'argument'
+    LOCAL = 'local'
+    STATIC = 'static'
+    THIS = 'this'
+    THAT = 'that'
+    POINTER = 'pointer'
+    TEMP = 'temp'
+
+    def __init__(self):
+        self.__lines = []
+
+    def writePush(self, segment, index):
+        self.__lines.append(f'push {segment} {index}')
+
+    def writePop(self, segment, index):
+        self.__lines.append(f'pop {segment} {index}')
+
+    def writeArithmetic(self, command):
+        "command: 'add' | 'sub' | 'neg' | 'eq' | 'gt' | 'lt' | 'and' | 'or' | 'not'"
+        self.__lines.append(command)
+
+    def writeLabel(self, label):
+        self.__lines.append('label ' + label)
+
+    def writeGoto(self, label):
+        self.__lines.append('goto ' + label)
+
+    def writeIf(self, label):
+        self.__lines.append('if-goto ' + label)
+
+    def writeCall(self, name, nArgs):
+        self.__lines.append(f'call {name} {nArgs}')
+
+    def writeFunction(self, name, nLocals):
+        self.__lines.append(f'function {name} {nLocals}')
+
+    def writeReturn(self):
+        self.__lines.append('return')
+
+    def lines(self):
+        'return: list of written commands, without line endings'
+        return self.__lines
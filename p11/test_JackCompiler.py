@@ -0,0 +1,50 @@
+'tests of JackCompiler on expressions nested deeper than the recursion limit'
+
+import os
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from JackCompiler import JackCompiler
+
+DEPTH = 5000 # well past sys.getrecursionlimit()
+
+def deep_class(expression):
+    return ('class Main {\n  function int f(int x) {\n    var Array a;\n'
+            f'    return {expression} + 1;\n  }}\n}}\n')
+
+class TestDeepExpressions(unittest.TestCase):
+
+    def compile(self, expression):
+        'return: list of VM commands of the compiled class'
+        with tempfile.TemporaryDirectory() as directory:
+            infile = os.path.join(directory, 'Main.jack')
+            with open(infile, 'w') as file:
+                file.write(deep_class(expression))
+            JackCompiler(infile).gen()
+            with open(infile[:-4] + 'vm') as file:
+                return file.read().splitlines()
+
+    def test_parentheses(self):
+        vm = self.compile('(' * DEPTH + 'x' + ')' * DEPTH)
+        self.assertEqual(vm, ['function Main.f 1', 'push argument 0', 'push constant 1',
+                              'add', 'return'])
+
+    def test_unary(self):
+        vm = self.compile('-~' * DEPTH + 'x')
+        self.assertEqual(vm[2:4], ['not', 'neg'])
+        self.assertEqual(vm.count('neg'), DEPTH)
+        self.assertEqual(vm.count('not'), DEPTH)
+
+    def test_call(self):
+        vm = self.compile('Main.f(' * DEPTH + 'x' + ')' * DEPTH)
+        self.assertEqual(vm.count('call Main.f 1'), DEPTH)
+        self.assertEqual(vm[-3:], ['push constant 1', 'add', 'return'])
+
+    def test_index(self):
+        vm = self.compile('a[' * DEPTH + 'x' + ']' * DEPTH)
+        self.assertEqual(vm.count('push that 0'), DEPTH)
+        self.assertEqual(vm[1:3], ['push argument 0', 'push local 0'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,61 +1,102 @@
 'Assembler'
 
-import sys
+import os
+import argparse
+from BuildCache import BuildCache
 from Code import Code
 from Parser import Parser
+from Optimizer import Optimizer
 
 class Assembler(object):
     '''Assembler
     method: preprocess()
-    method: gen()
+    method: gen(binary=False, byteorder='big')
+    method: object(), gen_object()
     '''
-    def __init__(self, file):
+    def __init__(self, file, cache=None, optimize=False):
+        '''file: string .asm file
+        cache: BuildCache, skip assembling if the source is unchanged
+        optimize: run the Optimizer between Parser and Code, not for object()'''
         self.__infilename = file
         if file.endswith('.asm'):
-            self.__outfilename = file[:-3] + 'hack'
+            self.__outfilename = file[:-4]
         else:
-            self.__outfilename = file + '.hack'
+            self.__outfilename = file
         self.__code = Code()
-        self.__parser = Parser(file)
+        self.__parser = None
+        self.__cache = cache
+        self.__optimize = optimize
+        self.__bincode = []
 
     def preprocess(self):
-        '''add the label symbol(First pass),
-        then add the variable symbol(Second pass)
+        '''tokenize and encode every instruction in a single pass,
+        see Code.assemble()
         raise: SyntaxError if error occurs
         return: self
         '''
+        key = None
+        if self.__cache and os.path.isfile(self.__infilename):
+            with open(self.__infilename, 'rb') as file:
+                key = self.__cache.key(file.read(), str(self.__optimize))
+            image = self.__cache.get(key)
+            if image is not None:
+                self.__bincode = Code.from_bytes(image)
+                return self
+        if self.__parser is None:
+            self.__parser = Parser(self.__infilename)
         self.__parser.reset()
-        while self.__parser.hasnext():
-            cmd, token, line = self.__parser.next()
-            if cmd == 'L':
-                if not self.__code.insert_label(token, line):
-                    raise SyntaxError('dupicate definition for label "{}"'.format(token))
-        self.__parser.reset()
-        while self.__parser.hasnext():
-            cmd, token, line = self.__parser.next()
-            if cmd == 'A':
-                self.__code.insert_var(token)
+        instrs = self.__parser.instructions()
+        if self.__optimize:
+            instrs = Optimizer().optimize(instrs)
+        self.__bincode = self.__code.assemble(instrs)
+        if key:
+            self.__cache.put(key, Code.to_bytes(self.__bincode))
         return self
 
-    def gen(self):
-        '''generate binary code in strings and stores in .hack file
-        '''
-        bincode = []
+    def object(self):
+        '''assemble the file as a unit of a program, see Linker
+        return: ObjectCode, raise SyntaxError if error occurs'''
+        if self.__parser is None:
+            self.__parser = Parser(self.__infilename)
         self.__parser.reset()
-        while self.__parser.hasnext():
-            cmd, token, _ = self.__parser.next()
-            if cmd == 'A':
-                bincode.append(self.__code.a_instr(token) + '\n')
-            elif cmd == 'C':
-                bincode.append(self.__code.c_instr(*token) + '\n')
-        with open(self.__outfilename, 'w') as outfile:
-            outfile.writelines(bincode)
+        return Code().assemble_object(self.__parser.instructions())
+
+    def gen_object(self):
+        'assemble the file as a unit of a program and store it in .obj file'
+        obj = self.object()
+        with open(self.__outfilename + '.obj', 'wb') as outfile:
+            outfile.write(obj.to_bytes())
+
+    def gen(self, binary=False, byteorder='big'):
+        '''generate binary code and stores in .hack file,
+        or in a packed 16-bit image(.bin file) if binary is True
+        byteorder: 'big' | 'little', byte order of the binary image
+        '''
+        if binary:
+            with open(self.__outfilename + '.bin', 'wb') as outfile:
+                outfile.write(Code.to_bytes(self.__bincode, byteorder))
+        else:
+            with open(self.__outfilename + '.hack', 'w') as outfile:
+                outfile.write(Code.to_text(self.__bincode))
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python Assembler.py <file.asm>")
-        sys.exit()
+    argparser = argparse.ArgumentParser(description='assemble a .asm file into a .hack file')
+    argparser.add_argument('src', help='.asm file')
+    formats = argparser.add_mutually_exclusive_group()
+    formats.add_argument('--bin', dest='byteorder', action='store_const', const='big',
+                         help='write a packed big-endian 16-bit image(.bin file)')
+    formats.add_argument('--bin-le', dest='byteorder', action='store_const', const='little',
+                         help='write a packed little-endian 16-bit image(.bin file)')
+    formats.add_argument('--obj', action='store_true',
+                         help='write a relocatable object(.obj file), see Linker.py')
+    argparser.add_argument('-O', '--optimize', action='store_true',
+                           help='remove unreachable code and unused labels, thread jumps')
+    args = argparser.parse_args()
 
-    src = sys.argv[1]
-    asm = Assembler(src)
-    asm.preprocess().gen()
+    asm = Assembler(args.src, BuildCache.from_env('Assembler'), args.optimize)
+    if args.obj:
+        asm.gen_object()
+    elif args.byteorder:
+        asm.preprocess().gen(binary=True, byteorder=args.byteorder)
+    else:
+        asm.preprocess().gen()
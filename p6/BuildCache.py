@@ -0,0 +1,66 @@
+'''content-hash build cache
+outputs are stored on disk, keyed by the hash of the source contents
+and the tool version(hash of the tool's own .py files)'''
+
+import os
+import glob
+import hashlib
+
+class BuildCache(object):
+    '''content-hash build cache
+    method: from_env(tool)
+    method: key(*contents)
+    method: get(key)
+    method: put(key, value)
+    '''
+    ENV = 'N2T_CACHE_DIR'
+
+    def __init__(self, tool, cachedir):
+        '''tool: string tool name, outputs of different tools never collide
+        cachedir: string root directory of the cache'''
+        digest = hashlib.sha256(tool.encode())
+        tooldir = os.path.dirname(os.path.abspath(__file__))
+        for src in sorted(glob.glob(os.path.join(tooldir, '*.py'))):
+            with open(src, 'rb') as file:
+                digest.update(file.read())
+        self.__version = digest.hexdigest()
+        self.__dir = os.path.join(cachedir, tool)
+
+    @classmethod
+    def from_env(cls, tool):
+        '''return: BuildCache in directory $N2T_CACHE_DIR, None if it is not set'''
+        cachedir = os.environ.get(cls.ENV)
+        if not cachedir:
+            return None
+        return cls(tool, cachedir)
+
+    def key(self, *contents):
+        '''contents: strings or bytes the output depends on
+        return: string key'''
+        digest = hashlib.sha256(self.__version.encode())
+        for content in contents:
+            if isinstance(content, str):
+                content = content.encode()
+            digest.update(len(content).to_bytes(8, 'big'))
+            digest.update(content)
+        return digest.hexdigest()
+
+    def get(self, key):
+        '''return: bytes stored with key, None if not cached'''
+        try:
+            with open(self.__path(key), 'rb') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def put(self, key, value):
+        '''store bytes value with key'''
+        path = self.__path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.' + str(os.getpid())
+        with open(tmp, 'wb') as file:
+            file.write(value)
+        os.replace(tmp, path) # atomic, concurrent builds never see partial output
+
+    def __path(self, key):
+        return os.path.join(self.__dir, key[:2], key)
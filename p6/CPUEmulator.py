@@ -0,0 +1,174 @@
+'''CPUEmulator: run .hack programs of the Hack computer
+
+ROM words are decoded once, then every basic block(instructions up to a jump)
+is compiled into a python function the first time it is entered.
+RAM is an array('h') of 32K signed 16-bit words, the screen memory map
+(0x4000-0x5fff) is a zero-copy memoryview of it.'''
+
+import sys
+from array import array
+from Code import Code
+
+class CPUEmulator(object):
+    '''Hack CPU emulator
+    method: load(file)
+    method: reset()
+    method: run(cycles)
+    attribute: rom, ram, screen, pc, a, d, halted
+    '''
+    SCREEN = 0x4000
+    KBD = 0x6000
+    RAM_SIZE = 0x8000
+
+    # comp bits -> expression of D and X(A or M)
+    comp_expr = {0b0101010: '0', 0b0111111: '1', 0b0111010: '-1', 0b0001100: 'D',
+                 0b0110000: 'X', 0b0001101: '~D', 0b0110001: '~X', 0b0001111: '-D',
+                 0b0110011: '-X', 0b0011111: 'D+1', 0b0110111: 'X+1', 0b0001110: 'D-1',
+                 0b0110010: 'X-1', 0b0000010: 'D+X', 0b0010011: 'D-X', 0b0000111: 'X-D',
+                 0b0000000: 'D&X', 0b0010101: 'D|X'}
+    # expressions that may overflow 16 bits
+    wrap_expr = {'-D', '-X', 'D+1', 'X+1', 'D-1', 'X-1', 'D+X', 'D-X', 'X-D'}
+    jump_cond = {0b001: 'x > 0', 0b010: 'x == 0', 0b011: 'x >= 0', 0b100: 'x < 0',
+                 0b101: 'x != 0', 0b110: 'x <= 0'}
+
+    def __init__(self, rom=()):
+        '''rom: iterable of 16-bit int code, e.g. output of Code.assemble()'''
+        self.ram = array('h', bytes(2 * self.RAM_SIZE))
+        self.screen = memoryview(self.ram)[self.SCREEN:self.KBD]
+        self.rom = []
+        self.__decoded = []
+        self.__blocks = {}
+        self.reset()
+        self.load(rom)
+
+    def load(self, rom):
+        '''load program, decode every word
+        rom: string .hack file, .bin file(big-endian image) or iterable of 16-bit int code
+        return: self, raise RuntimeError on illegal instruction
+        '''
+        if isinstance(rom, str):
+            if rom.endswith('.hack'):
+                with open(rom, 'r') as file:
+                    rom = [int(line, 2) for line in file if line.strip()]
+            else:
+                with open(rom, 'rb') as file:
+                    rom = Code.from_bytes(file.read())
+        self.rom = list(rom)
+        self.__decoded = [self.__decode(addr, word) for addr, word in enumerate(self.rom)]
+        self.__blocks = {}
+        self.reset()
+        return self
+
+    def reset(self):
+        'restart the program, RAM is kept'
+        self.pc = 0
+        self.a = 0
+        self.d = 0
+        self.halted = False
+        return self
+
+    @property
+    def keyboard(self):
+        'key code in the keyboard memory map'
+        return self.ram[self.KBD]
+
+    @keyboard.setter
+    def keyboard(self, key):
+        self.ram[self.KBD] = key
+
+    def run(self, cycles=sys.maxsize):
+        '''execute instructions until the cycle budget is used, the pc leaves
+        the ROM or the program halts in an infinite loop(@n, 0;JMP at n)
+        return: number of executed instructions
+        '''
+        a, d, pc = self.a, self.d, self.pc
+        ram = self.ram
+        blocks = self.__blocks
+        left = cycles
+        while left > 0:
+            block = blocks.get(pc)
+            if block is None:
+                if not 0 <= pc < len(self.rom):
+                    self.halted = True
+                    break
+                block = blocks[pc] = self.__compile(pc)
+            func, count, halt = block
+            if halt:
+                self.halted = True
+                break
+            if count > left:
+                func, count, _ = self.__compile(pc, left)
+            pc, a, d = func(a, d, ram)
+            left -= count
+        self.a, self.d, self.pc = a, d, pc
+        return cycles - left
+
+    def __decode(self, addr, word):
+        '''return: ('A', value) | ('C', comp expression, uses M, dest bits, jump bits)'''
+        if not word & 0x8000:
+            return 'A', word
+        comp = word >> 6 & 0x7f
+        expr = self.comp_expr.get(comp & 0x3f)
+        if word >> 13 != 0b111 or expr is None:
+            raise RuntimeError('illegal instruction {:016b} at {}'.format(word, addr))
+        return 'C', expr, comp >> 6, word >> 3 & 0b111, word & 0b111
+
+    def __compile(self, start, limit=None):
+        '''compile the basic block beginning at start, at most limit instructions
+        return: (function(a, d, ram) -> (pc, a, d), instruction count, halt)'''
+        lines = []
+        addr = 'A & 32767' # A may not be a valid address unless set by A-instruction
+        pc = start
+        end = len(self.rom) if limit is None else min(len(self.rom), start + limit)
+        decoded = self.__decoded
+        while pc < end:
+            instr = decoded[pc]
+            pc += 1
+            if instr[0] == 'A':
+                lines.append('A = {}'.format(instr[1]))
+                addr = 'A'
+                continue
+            _, expr, use_m, dest, jump = instr
+            if use_m:
+                expr = expr.replace('X', 'M[{}]'.format(addr))
+            elif 'X' in expr:
+                expr = expr.replace('X', 'A')
+            if instr[1] in self.wrap_expr:
+                expr = '(({}) + 32768 & 65535) - 32768'.format(expr)
+            lines.append('x = ' + expr)
+            if dest & 0b001:
+                lines.append('M[{}] = x'.format(addr))
+            target = 'A'
+            if dest & 0b100:
+                if jump:
+                    lines.append('t = A')
+                    target = 't'
+                lines.append('A = x')
+                addr = 'A & 32767'
+            if dest & 0b010:
+                lines.append('D = x')
+            if jump == 0b111:
+                lines.append('return {}, A, D'.format(target))
+                break
+            elif jump:
+                lines.append('if {}: return {}, A, D'.format(self.jump_cond[jump], target))
+                lines.append('return {}, A, D'.format(pc))
+                break
+        else:
+            lines.append('return {}, A, D'.format(pc))
+        halt = limit is None and pc == start + 2 and decoded[start] == ('A', start) \
+               and decoded[start + 1][1:] == ('0', 0, 0, 0b111)
+        source = 'def block(A, D, M):\n    ' + '\n    '.join(lines)
+        namespace = {}
+        exec(compile(source, '<rom {}>'.format(start), 'exec'), namespace)
+        return namespace['block'], pc - start, halt
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3) or (len(sys.argv) == 3 and not sys.argv[2].isdigit()):
+        print("Usage: python CPUEmulator.py <file.hack|file.bin> [cycles]")
+        sys.exit()
+
+    cpu = CPUEmulator(sys.argv[1])
+    count = cpu.run(int(sys.argv[2]) if len(sys.argv) == 3 else sys.maxsize)
+    print('{} instructions, pc={}{}'.format(count, cpu.pc, ' (halted)' if cpu.halted else ''))
+    print('RAM[0:16]:', cpu.ram[0:16].tolist())
@@ -1,14 +1,21 @@
 'generate binary code from instruction'
 
 import re
+import sys
+from array import array
 from SymTable import SymTable
+from ObjectCode import ObjectCode
 
 class Code(object):
     '''generate binary code from instruction
     method: insert_label(label, line),
     method: insert_var(var),
+    method: resolve(addrcode),
+    method: assemble(instrs), assemble_object(instrs)
     method: a_instr(addrcode),
     method: c_instr(compcode, destcode, jumpcode)
+    method: a_code(addrcode), c_code(destcode, compcode, jumpcode): 16-bit int
+    method: to_text(codes), to_bytes(codes, byteorder), from_bytes(image, byteorder)
     '''
     comp_map = {'0':'0101010', '1':'0111111', '-1':'0111010', 'D':'0001100',
                 'A':'0110000', '!D':'0001101', '!A':'0110001', '-D':'0001111',
@@ -18,7 +25,9 @@ class Code(object):
                 'M':'1110000', '!M':'1110001', '-M':'1110011', 'M+1':'1110111',
                 'M-1':'1110010', 'D+M':'1000010', 'D-M':'1010011', 'M-D':'1000111',
                 'D&M':'1000000', 'D|M':'1010101',
-                'A+D':'0000010', 'M+D':'1000010'} # to pass p4/fill/Fill.asm, which contains A=A+D
+                'A+D':'0000010', 'M+D':'1000010', # to pass p4/fill/Fill.asm, which contains A=A+D
+                'A&D':'0000000', 'A|D':'0010101',
+                'M&D':'1000000', 'M|D':'1010101'} # p7/p8 CodeWriter writes M&D and M|D
 
     dest_map = {'':'000', 'M':'001', 'D':'010', 'MD':'011',
                 'A':'100', 'AM':'101', 'AD':'110', 'AMD':'111'}
@@ -28,6 +37,11 @@ class Code(object):
 
     num_p = re.compile(r'^\d+$')
 
+    MAX_ADDR = 0x7fff
+
+    # (dest, comp, jump) -> 16-bit C-instruction, filled below the class
+    c_table = {}
+
     def __init__(self):
         self.__symtable = SymTable()
         self.__count = 15
@@ -62,20 +76,105 @@ class Code(object):
             self.__symtable.add(var, self.__count)
             return str(self.__count)
 
+    def resolve(self, addrcode):
+        '''get the address of A-instruction without adding new symbol
+        addrcode: string A-instruction
+        return: address, None if the symbol is not defined yet
+        '''
+        if self.num_p.match(addrcode):
+            return addrcode
+        return self.__symtable.get(addrcode)
+
+    def assemble(self, instrs):
+        '''encode instructions in a single pass, labels are added when defined,
+        symbols referenced before their definition are recorded and patched
+        at the end(labels first, remaining symbols become variables in order
+        of first use)
+        instrs: iterable of ('A', address) | ('C', dest, comp, jump) | ('L', label)
+        | ('W', code), code is an encoded C-instruction, other tuples are ignored
+        return: list of 16-bit int code, raise SyntaxError on failure
+        '''
+        bincode = []
+        forward = {} # symbol -> indexes in bincode, in order of first use
+        for instr in instrs:
+            cmd = instr[0]
+            if cmd == 'W':
+                bincode.append(instr[1])
+            elif cmd == 'A':
+                if self.resolve(instr[1]) is None:
+                    forward.setdefault(instr[1], []).append(len(bincode))
+                    bincode.append(None)
+                else:
+                    bincode.append(self.a_code(instr[1]))
+            elif cmd == 'C':
+                bincode.append(self.c_code(instr[1], instr[2], instr[3]))
+            elif cmd == 'L':
+                if not self.insert_label(instr[1], len(bincode)):
+                    raise SyntaxError('dupicate definition for label "{}"'.format(instr[1]))
+        # backpatch
+        for symbol, indexes in forward.items():
+            self.insert_var(symbol)
+            code = self.a_code(symbol)
+            for i in indexes:
+                bincode[i] = code
+        return bincode
+
+    def assemble_object(self, instrs):
+        '''encode instructions of a unit linked later with other units, see Linker,
+        only the predefined symbols are resolved, call it on a new Code
+        instrs: see assemble()
+        return: ObjectCode, raise SyntaxError on failure
+        '''
+        bincode = []
+        labels = {}
+        forward = {} # symbol -> indexes in bincode, in order of first use
+        for instr in instrs:
+            cmd = instr[0]
+            if cmd == 'W':
+                bincode.append(instr[1])
+            elif cmd == 'A':
+                if self.resolve(instr[1]) is None:
+                    forward.setdefault(instr[1], []).append(len(bincode))
+                    bincode.append(0)
+                else:
+                    bincode.append(self.a_code(instr[1]))
+            elif cmd == 'C':
+                bincode.append(self.c_code(instr[1], instr[2], instr[3]))
+            elif cmd == 'L':
+                if instr[1] in labels or self.resolve(instr[1]) is not None:
+                    raise SyntaxError('dupicate definition for label "{}"'.format(instr[1]))
+                labels[instr[1]] = len(bincode)
+        relocs = []
+        for symbol in [symbol for symbol in forward if symbol in labels]:
+            for i in forward.pop(symbol):
+                bincode[i] = labels[symbol]
+                relocs.append(i)
+        relocs.sort()
+        return ObjectCode(bincode, labels, relocs, forward)
+
     def a_instr(self, addrcode):
         '''generate binary code for A-instruction
         addrcode: string A-instruction
         return: string code on success, raise SyntaxError on failure
         '''
+        return format(self.a_code(addrcode), '016b')
+
+    def a_code(self, addrcode):
+        '''generate 16-bit code for A-instruction
+        addrcode: string A-instruction
+        return: int code on success, raise SyntaxError on failure
+        '''
         if not addrcode or addrcode == '':
             raise SyntaxError('empty adrress in A-instruction')
         elif self.num_p.match(addrcode):
-            return self.__tobinary(addrcode).zfill(16)
+            addr = int(addrcode)
         elif self.__symtable.contains(addrcode):
-            addr = self.__symtable.get(addrcode)
-            return self.__tobinary(addr).zfill(16)
+            addr = int(self.__symtable.get(addrcode))
         else:
             raise SyntaxError('symbol "{}" not found'.format(addrcode))
+        if addr > self.MAX_ADDR:
+            raise SyntaxError('address {} out of range in A-instruction'.format(addrcode))
+        return addr
 
     def comp(self, compcode):
         '''get comp code'''
@@ -96,16 +195,52 @@ class Code(object):
         jumpcode: string jump code
         return: string code on success, raise SyntaxError on failure
         '''
+        return format(self.c_code(destcode, compcode, jumpcode), '016b')
+
+    def c_code(self, destcode, compcode, jumpcode):
+        '''generate 16-bit code for C-instruction,
+        destcode: string dest code
+        compcode: string comp code
+        jumpcode: string jump code
+        return: int code on success, raise SyntaxError on failure
+        '''
         try:
-            ccode = '111' + self.comp(compcode) \
-                          + self.dest(destcode) \
-                          + self.jump(jumpcode)
-        except TypeError:
+            return self.c_table[destcode, compcode, jumpcode]
+        except KeyError:
             raise SyntaxError('invalid (dest,comp,jump): ({},{},{})'\
                               .format(destcode, compcode, jumpcode))
-        else:
-            return ccode
 
-    def __tobinary(self, number):
-        '''translate int string to base 2(binary)'''
-        return bin(int(number))[2:]
+    @staticmethod
+    def to_text(codes):
+        '''codes: iterable of 16-bit int code
+        return: string content of .hack file
+        '''
+        return ''.join([format(code, '016b') + '\n' for code in codes])
+
+    @staticmethod
+    def to_bytes(codes, byteorder='big'):
+        '''codes: iterable of 16-bit int code
+        byteorder: 'big' | 'little'
+        return: bytes of the packed binary image
+        '''
+        image = array('H', codes)
+        if byteorder != sys.byteorder:
+            image.byteswap()
+        return image.tobytes()
+
+    @staticmethod
+    def from_bytes(image, byteorder='big'):
+        '''image: bytes of the packed binary image
+        byteorder: 'big' | 'little'
+        return: array('H') of 16-bit int code
+        '''
+        codes = array('H')
+        codes.frombytes(image)
+        if byteorder != sys.byteorder:
+            codes.byteswap()
+        return codes
+
+Code.c_table = {(dest, comp, jump): 0b111 << 13 | int(c, 2) << 6 | int(d, 2) << 3 | int(j, 2)
+                for comp, c in Code.comp_map.items()
+                for dest, d in Code.dest_map.items()
+                for jump, j in Code.jump_map.items()}
@@ -0,0 +1,150 @@
+'''Disassembler: load, validate, disassemble and diff Hack machine code
+
+the text of every one of the 65536 words is computed once from the tables of Code,
+then a whole ROM is loaded, checked and disassembled with C-level array and map
+operations, without a python loop per word'''
+
+import re
+import sys
+import argparse
+from array import array
+from itertools import repeat
+from Code import Code
+
+class Disassembler(object):
+    '''Hack machine code tools, every method is a classmethod
+    method: load(file), from_text(text)
+    method: validate(codes)
+    method: disassemble(codes)
+    method: diff(codes, other)
+    '''
+    line_p = re.compile(rb'[01]{16}')
+
+    CHUNK = 1 << 10 # words compared at once by diff()
+
+    __words = None # word -> text, None if illegal
+
+    @classmethod
+    def load(cls, file):
+        '''load a .hack file, or a .bin file(big-endian image)
+        return: array('H') of 16-bit int code, raise SyntaxError if file is not a program'''
+        try:
+            with open(file, 'rb') as infile:
+                image = infile.read()
+        except FileNotFoundError:
+            print("python: can't open file '{}'".format(file))
+            sys.exit()
+        if file.endswith('.hack'):
+            return cls.from_text(image)
+        if len(image) % 2:
+            raise SyntaxError('odd number of bytes in 16-bit image')
+        return Code.from_bytes(image)
+
+    @classmethod
+    def from_text(cls, text):
+        '''text: string or bytes content of .hack file
+        return: array('H') of 16-bit int code, raise SyntaxError on a malformed line'''
+        if isinstance(text, str):
+            text = text.encode()
+        lines = text.split()
+        if text.translate(None, b'01 \t\r\n\x0b\x0c') or set(map(len, lines)) - {16}:
+            for i, line in enumerate(text.splitlines()):
+                if line.strip() and not cls.line_p.fullmatch(line.strip()):
+                    raise SyntaxError('line {}, invalid machine code: {}'
+                                      .format(i + 1, line.decode(errors='replace')))
+        if not lines:
+            return array('H')
+        # one conversion of all the bits, then the bytes are split into words
+        return Code.from_bytes(int(b''.join(lines), 2).to_bytes(2 * len(lines), 'big'))
+
+    @classmethod
+    def validate(cls, codes):
+        '''check every word: C-instructions start with 111 and have a legal comp code
+        return: list of (address, reason) of the illegal words'''
+        words = cls.__table()
+        if None not in map(words.__getitem__, codes):
+            return []
+        errors = []
+        for addr, word in enumerate(codes):
+            if words[word] is None:
+                if word >> 13 != 0b111:
+                    reason = 'C-instruction prefix {:03b}, should be 111'.format(word >> 13)
+                else:
+                    reason = 'illegal comp bits {:07b}'.format(word >> 6 & 0x7f)
+                errors.append((addr, reason))
+        return errors
+
+    @classmethod
+    def disassemble(cls, codes):
+        '''codes: iterable of 16-bit int code
+        return: list of string instructions, illegal words become a comment'''
+        texts = list(map(cls.__table().__getitem__, codes))
+        if None in texts:
+            for addr, text in enumerate(texts):
+                if text is None:
+                    texts[addr] = '// illegal {:016b}'.format(codes[addr])
+        return texts
+
+    @classmethod
+    def diff(cls, codes, other):
+        '''compare two programs, equal chunks are skipped without looking at their words
+        return: list of (address, instruction of codes, instruction of other),
+        None for a missing word'''
+        a, b = array('H', codes), array('H', other)
+        words = cls.__table()
+        changes = []
+        for start in range(0, max(len(a), len(b)), cls.CHUNK):
+            end = start + cls.CHUNK
+            if a[start:end] == b[start:end]:
+                continue
+            for addr in range(start, min(end, max(len(a), len(b)))):
+                x = a[addr] if addr < len(a) else None
+                y = b[addr] if addr < len(b) else None
+                if x != y:
+                    changes.append((addr, cls.__text(words, x), cls.__text(words, y)))
+        return changes
+
+    @staticmethod
+    def __text(words, word):
+        if word is None:
+            return None
+        return words[word] or '// illegal {:016b}'.format(word)
+
+    @classmethod
+    def __table(cls):
+        'return: list of the text of every 16-bit word, None if illegal'
+        if cls.__words is None:
+            words = ['@' + str(addr) for addr in range(Code.MAX_ADDR + 1)]
+            words.extend(repeat(None, Code.MAX_ADDR + 1))
+            for (dest, comp, jump), word in Code.c_table.items():
+                if words[word] is None: # the first of the comp aliases, e.g. D+A for A+D
+                    text = dest + '=' + comp if dest else comp
+                    words[word] = text + ';' + jump if jump else text
+            cls.__words = words
+        return cls.__words
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='disassemble a .hack or .bin file')
+    argparser.add_argument('src', help='.hack file or .bin file')
+    argparser.add_argument('--check', action='store_true',
+                           help='only report the illegal words')
+    argparser.add_argument('--diff', metavar='OTHER', help='compare with another program')
+    argparser.add_argument('--addr', action='store_true', help='prefix lines with their address')
+    args = argparser.parse_args()
+
+    rom = Disassembler.load(args.src)
+    if args.diff:
+        changes = Disassembler.diff(rom, Disassembler.load(args.diff))
+        for addr, old, new in changes:
+            print('{}: {} | {}'.format(addr, old, new))
+        sys.exit(1 if changes else 0)
+    errors = Disassembler.validate(rom)
+    for addr, reason in errors:
+        print('{}: {}'.format(addr, reason))
+    if not args.check:
+        texts = Disassembler.disassemble(rom)
+        if args.addr:
+            texts = ['{}\t{}'.format(addr, text) for addr, text in enumerate(texts)]
+        sys.stdout.write('\n'.join(texts) + '\n' if texts else '')
+    if errors:
+        sys.exit(1)
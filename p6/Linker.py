@@ -0,0 +1,106 @@
+'''Linker: link relocatable objects(.obj) and .asm units into one program
+
+the objects are placed in the order given, the labels of every object are visible
+to the others, and the symbols no object defines become variables from RAM[16]
+in order of first use, so linking the units gives the same code as assembling
+the concatenation of their sources'''
+
+import sys
+import argparse
+from Code import Code
+from ObjectCode import ObjectCode
+from Assembler import Assembler
+
+class Linker(object):
+    '''link objects into one program
+    method: add(obj, name)
+    method: add_file(file)
+    method: link()
+    method: gen(outfile, binary, byteorder)
+    '''
+
+    def __init__(self):
+        self.__objects = [] # (ObjectCode, name)
+        self.__bincode = None
+
+    def add(self, obj, name=''):
+        '''append an object to the program
+        obj: ObjectCode
+        name: string name in error messages'''
+        self.__objects.append((obj, name))
+        self.__bincode = None
+
+    def add_file(self, file):
+        '''append a .obj file, or a .asm file assembled to an object in memory
+        raise: SyntaxError if the file is invalid'''
+        if file.endswith('.asm'):
+            obj = Assembler(file).object()
+        else:
+            try:
+                with open(file, 'rb') as infile:
+                    obj = ObjectCode.from_bytes(infile.read())
+            except FileNotFoundError:
+                print("python: can't open file '{}'".format(file))
+                sys.exit()
+        self.add(obj, file)
+
+    def link(self):
+        '''place the objects, allocate variables and patch addresses
+        return: list of 16-bit int code, raise SyntaxError on failure'''
+        if self.__bincode is not None:
+            return self.__bincode
+        code = Code()
+        bases = []
+        base = 0
+        for obj, name in self.__objects:
+            bases.append(base)
+            for label, offset in obj.labels.items():
+                if not code.insert_label(label, base + offset):
+                    raise SyntaxError('{}: dupicate definition for label "{}"'.format(name, label))
+            base += len(obj.code)
+        bincode = []
+        for (obj, name), base in zip(self.__objects, bases):
+            part = list(obj.code)
+            for i in obj.relocs:
+                part[i] += base
+                if part[i] > Code.MAX_ADDR:
+                    raise SyntaxError('{}: label address {} out of range in A-instruction'
+                                      .format(name, part[i]))
+            for symbol, indexes in obj.imports.items():
+                code.insert_var(symbol)
+                try:
+                    addr = code.a_code(symbol)
+                except SyntaxError as err:
+                    raise SyntaxError('{}: {}'.format(name, err))
+                for i in indexes:
+                    part[i] = addr
+            bincode.extend(part)
+        self.__bincode = bincode
+        return bincode
+
+    def gen(self, outfile, binary=False, byteorder='big'):
+        '''link and write the program into a .hack file, or a packed 16-bit image
+        if binary is True, see Assembler.gen()'''
+        bincode = self.link()
+        if binary:
+            with open(outfile, 'wb') as file:
+                file.write(Code.to_bytes(bincode, byteorder))
+        else:
+            with open(outfile, 'w') as file:
+                file.write(Code.to_text(bincode))
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description='link .obj and .asm files into a .hack file')
+    argparser.add_argument('files', nargs='+', help='.obj or .asm files, in program order')
+    argparser.add_argument('-o', '--output', required=True, help='output .hack or .bin file')
+    formats = argparser.add_mutually_exclusive_group()
+    formats.add_argument('--bin', dest='byteorder', action='store_const', const='big',
+                         help='write a packed big-endian 16-bit image')
+    formats.add_argument('--bin-le', dest='byteorder', action='store_const', const='little',
+                         help='write a packed little-endian 16-bit image')
+    args = argparser.parse_args()
+
+    linker = Linker()
+    for infile in args.files:
+        linker.add_file(infile)
+    linker.gen(args.output, args.byteorder is not None, args.byteorder or 'big')
@@ -0,0 +1,38 @@
+'''relocatable object of an assembled .asm unit, see Code.assemble_object() and Linker'''
+
+import marshal
+
+class ObjectCode(object):
+    '''relocatable object
+    code: list of 16-bit int code, assembled at address 0
+    labels: dict of label -> offset in code, exported to the other objects
+    relocs: indexes in code holding the offset of a label of this object
+    imports: dict of symbol -> indexes in code, in order of first use, each symbol is
+    a label of another object or becomes a variable when linked
+    method: to_bytes(), from_bytes(data)
+    '''
+    MAGIC = b'HOBJ\x01'
+
+    __slots__ = ('code', 'labels', 'relocs', 'imports')
+
+    def __init__(self, code, labels, relocs, imports):
+        self.code = code
+        self.labels = labels
+        self.relocs = relocs
+        self.imports = imports
+
+    def to_bytes(self):
+        'return: bytes of the .obj file'
+        return self.MAGIC + marshal.dumps((list(self.code), self.labels,
+                                           self.relocs, self.imports))
+
+    @classmethod
+    def from_bytes(cls, data):
+        '''data: bytes of the .obj file
+        return: ObjectCode, raise SyntaxError if data is not an object'''
+        if not data.startswith(cls.MAGIC):
+            raise SyntaxError('not a Hack object file')
+        try:
+            return cls(*marshal.loads(data[len(cls.MAGIC):]))
+        except (EOFError, ValueError, TypeError):
+            raise SyntaxError('corrupted Hack object file')
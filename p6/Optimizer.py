@@ -0,0 +1,144 @@
+'''Optimizer: shrink a whole program before it is encoded
+
+the instructions are split into basic blocks, which start at labels and end after
+jumps. A block reachable from address 0 reaches the next block unless it ends with
+an unconditional jump, and every label it references, since an address loaded into
+A may be jumped to later(return addresses). Then:
+- references to a block that only jumps on(@M, 0;JMP) are threaded to M, the
+  address of a label is assumed to be used only to jump to it
+- unreachable blocks are removed
+- labels no instruction references are removed'''
+
+from Code import Code
+
+class Optimizer(object):
+    '''optimize instructions in the form of Code.assemble()
+    method: optimize(instrs)
+    attribute: removed, threaded, unused: instructions removed, references threaded
+    and labels removed by the last optimize()
+    '''
+    JMP = Code.c_table['', '0', 'JMP'] & 0b111
+
+    def __init__(self):
+        self.removed = 0
+        self.threaded = 0
+        self.unused = 0
+
+    def optimize(self, instrs):
+        '''instrs: iterable of instructions of a whole program, see Code.assemble(),
+        it is returned unchanged if it jumps to a numeric address other than 0,
+        which would move
+        return: list of instructions, raise SyntaxError on duplicate labels'''
+        instrs = [instr for instr in instrs if instr[0] in ('A', 'C', 'W', 'L')]
+        self.removed = self.threaded = self.unused = 0
+        if self.__numeric_jump(instrs):
+            return instrs
+        blocks = self.__blocks(instrs)
+        index = {}
+        for i, (labels, _) in enumerate(blocks):
+            for label in labels:
+                if label in index:
+                    raise SyntaxError('dupicate definition for label "{}"'.format(label))
+                index[label] = i
+        self.__thread(blocks, index)
+        reachable = self.__reachable(blocks, index)
+        used = {instr[1] for i in reachable for instr in blocks[i][1]
+                if instr[0] == 'A' and instr[1] in index}
+        out = []
+        for i, (labels, code) in enumerate(blocks):
+            if i not in reachable:
+                self.removed += len(code)
+                self.unused += len(labels)
+                continue
+            for label in labels:
+                if label in used:
+                    out.append(('L', label))
+                else:
+                    self.unused += 1
+            out.extend(code)
+        return out
+
+    @classmethod
+    def __blocks(cls, instrs):
+        'return: list of [labels, instructions] of the basic blocks'
+        blocks = [[[], []]]
+        for instr in instrs:
+            if instr[0] == 'L':
+                if blocks[-1][1]:
+                    blocks.append([[], []])
+                blocks[-1][0].append(instr[1])
+            else:
+                blocks[-1][1].append(instr)
+                if cls.__jump(instr):
+                    blocks.append([[], []])
+        return blocks
+
+    def __thread(self, blocks, index):
+        'replace @L by @M when the block of L is @M, 0;JMP, following chains'
+        forward = {}
+        for labels, code in blocks:
+            if len(code) == 2 and code[0][0] == 'A' and code[0][1] in index \
+               and self.__jump(code[1]) == self.JMP and not self.__dest(code[1]):
+                for label in labels:
+                    forward[label] = code[0][1]
+        for label in list(forward):
+            seen = {label}
+            target = forward[label]
+            while target in forward and target not in seen:
+                seen.add(target)
+                target = forward[target]
+            forward[label] = target
+        for _, code in blocks:
+            for i, instr in enumerate(code):
+                if instr[0] == 'A' and instr[1] in forward and forward[instr[1]] != instr[1]:
+                    code[i] = ('A', forward[instr[1]])
+                    self.threaded += 1
+
+    def __reachable(self, blocks, index):
+        'return: set of the indexes of the blocks reachable from address 0'
+        reachable = set()
+        stack = [0]
+        while stack:
+            i = stack.pop()
+            if i in reachable:
+                continue
+            reachable.add(i)
+            code = blocks[i][1]
+            stack.extend(index[instr[1]] for instr in code
+                         if instr[0] == 'A' and instr[1] in index)
+            if i + 1 < len(blocks) and not (code and self.__jump(code[-1]) == self.JMP):
+                stack.append(i + 1)
+        return reachable
+
+    @classmethod
+    def __numeric_jump(cls, instrs):
+        'return: True if a jump takes its address from a numeric A-instruction other than @0'
+        a_reg = None
+        for instr in instrs:
+            if instr[0] == 'A':
+                a_reg = instr[1]
+            elif instr[0] == 'L':
+                a_reg = None
+            else:
+                if cls.__jump(instr) and a_reg is not None and a_reg.isdigit() \
+                   and int(a_reg) != 0:
+                    return True
+                if cls.__dest(instr) & 0b100:
+                    a_reg = None
+        return False
+
+    @staticmethod
+    def __jump(instr):
+        'return: jump bits of a C-instruction, 0 for other instructions'
+        if instr[0] == 'W':
+            return instr[1] & 0b111
+        if instr[0] == 'C':
+            return int(Code.jump_map.get(instr[3], '000'), 2)
+        return 0
+
+    @staticmethod
+    def __dest(instr):
+        'return: dest bits(A, D, M) of a C-instruction'
+        if instr[0] == 'W':
+            return instr[1] >> 3 & 0b111
+        return int(Code.dest_map.get(instr[1], '000'), 2)
@@ -2,14 +2,51 @@
 
 import re
 import sys
+from collections import OrderedDict
 from Code import Code
 
+class LineCache(object):
+    '''bounded memo table of source line -> instruction in the form of Code.assemble(),
+    generated code repeats the same lines(@SP, AM=M-1, ...) over and over
+    hits, misses: number of lines found or not found in the table, label definitions
+    are not counted
+    method: put(line, instr)
+    method: clear()
+    method: hit_rate()
+    '''
+    def __init__(self, size=1 << 13):
+        'size: maximum number of lines, the least recently used line is dropped first'
+        self.size = size
+        self.clear()
+
+    def put(self, line, instr):
+        'add a line that was not found, dropping the least recently used line if full'
+        if len(self.table) >= self.size:
+            self.table.popitem(last=False)
+        self.table[line] = instr
+
+    def clear(self):
+        'empty the table and reset the counters'
+        self.table = OrderedDict() # in order of last use
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        'return: hits / lines looked up'
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
 class Parser(object):
     '''check and tokenize the source file
     method: next()
+    method: instructions()
     method: hasnext()
     method: reset()
+    line_cache: LineCache shared by all parsers
     '''
+    line_cache = LineCache()
+    __BLANK = () # instruction of a line without code
+
     def __init__(self, src):
         self.__ptr = 0
         self.__line = -1
@@ -40,37 +77,82 @@ class Parser(object):
             self.__line += 1 # current line number
             instr = self.__lines[self.__ptr]
             self.__ptr += 1
-            # remove white spaces
-            processed = self.__p.sub("", instr)
-            if processed == '':
+            parsed = self.__parse(instr)
+            if parsed is None:
                 self.__line -= 1
                 continue
-            if processed[0] == '@':
-                # A-instruction
-                if self.__num_p.match(processed[1:]) or self.__var.match(processed[1:]):
-                    return 'A', processed[1:], self.__line
-                else:
-                    raise SyntaxError('line {} contains invalid variable: {}'\
-                                      .format(self.__ptr, instr))
-            elif self.__label.match(processed):
-                # label definition
+            if parsed[0] == 'L':
                 self.__line -= 1
-                return 'L', processed[1:-1], self.__line + 1
+                return 'L', parsed[1], self.__line + 1
+            return parsed[0], parsed[1], self.__line
+
+    def instructions(self):
+        '''yield: the remaining instructions in the form of Code.assemble(),
+        C-instructions are encoded as ('W', code), lines are looked up in line_cache first'''
+        cache = self.line_cache
+        table = cache.table
+        blank = self.__BLANK
+        hits = misses = 0
+        try:
+            while self.__ptr < self.__rows:
+                line = self.__lines[self.__ptr]
+                self.__ptr += 1
+                instr = table.get(line)
+                if instr is None:
+                    misses += 1
+                    parsed = self.__parse(line)
+                    if parsed is None:
+                        instr = blank
+                    elif parsed[0] == 'L': # unique, neither kept nor counted
+                        misses -= 1
+                        yield parsed
+                        continue
+                    elif parsed[0] == 'C':
+                        instr = ('W', Code.c_table[parsed[1]])
+                    else:
+                        instr = parsed
+                    cache.put(line, instr)
+                else:
+                    hits += 1
+                    table.move_to_end(line)
+                if instr is not blank:
+                    yield instr
+        finally:
+            cache.hits += hits
+            cache.misses += misses
+
+    def __parse(self, instr):
+        '''instr: line without comment, the line number of errors is self.__ptr
+        return: ('A'|'C'|'L', tokens) as in next(), None if the line has no code'''
+        # remove white spaces
+        processed = self.__p.sub("", instr)
+        if processed == '':
+            return None
+        if processed[0] == '@':
+            # A-instruction
+            if self.__num_p.match(processed[1:]) or self.__var.match(processed[1:]):
+                return 'A', processed[1:]
             else:
-                # C-instruction ?
-                d = processed.find('=')
-                if d == -1:
-                    d = 0
-                    processed = '=' + processed
-                j = processed.find(';')
-                if j == -1:
-                    j = len(processed)
-                    processed = processed + ';'
-                if d > j or not(processed[:d] in Code.dest_map \
-                                and processed[d+1:j] in Code.comp_map \
-                                and processed[j+1:] in Code.jump_map):
-                    raise SyntaxError('line {}, invalid code: {}'.format(self.__ptr, instr))
-                return 'C', (processed[:d], processed[d+1:j], processed[j+1:]), self.__line
+                raise SyntaxError('line {} contains invalid variable: {}'\
+                                  .format(self.__ptr, instr))
+        elif self.__label.match(processed):
+            # label definition
+            return 'L', processed[1:-1]
+        else:
+            # C-instruction ?
+            d = processed.find('=')
+            if d == -1:
+                d = 0
+                processed = '=' + processed
+            j = processed.find(';')
+            if j == -1:
+                j = len(processed)
+                processed = processed + ';'
+            if d > j or not(processed[:d] in Code.dest_map \
+                            and processed[d+1:j] in Code.comp_map \
+                            and processed[j+1:] in Code.jump_map):
+                raise SyntaxError('line {}, invalid code: {}'.format(self.__ptr, instr))
+            return 'C', (processed[:d], processed[d+1:j], processed[j+1:])
 
     def hasnext(self):
         'return: True if has next instruction'
@@ -79,4 +161,5 @@ class Parser(object):
     def reset(self):
         'restart to read from first instruction'
         self.__ptr = 0
+        self.__line = -1
         return self
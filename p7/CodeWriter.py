@@ -7,19 +7,46 @@ class CodeWriter(object):
     method: parse(command)
     method: close()
     method: writeInit()
+    method: setFileName(filename)
+    method: fragment()
+    method: writeFragment(fragment)
     '''
     __tab = '    '
     __LABEL_NAME = '__LABEL'
     def __init__(self, out):
         self.__instr_count = 0
         self._label_count = -1
+        self._label_prefix = self.__LABEL_NAME
         self._outfile = open(out, 'w')
+        self.__lines = [] # lines of current fragment, without instruction count
 
     def close(self):
         'close file'
         if self._outfile:
+            self.__flush()
             self._outfile.close()
 
+    def setFileName(self, filename):
+        '''start translating a new .vm file, the code of each file forms
+        a fragment that doesn't depend on the other files
+        filename: string file name without '.vm'
+        '''
+        self.__flush()
+        self._label_count = -1
+        self._label_prefix = filename + '.' + self.__LABEL_NAME
+
+    def fragment(self):
+        'return: string code generated since the last setFileName()'
+        return ''.join(self.__lines)
+
+    def writeFragment(self, fragment):
+        '''write code returned by fragment(), instead of translating the file again
+        fragment: string code
+        '''
+        self.__flush()
+        self.__lines = fragment.splitlines(True)
+        self.__flush()
+
     def writeInit(self):
         'write bootstrap code in the beginning'
         self._a_instr('256')
@@ -334,9 +361,7 @@ class CodeWriter(object):
         'print A-Instruction'
         if isinstance(addr, int):
             addr = str(addr)
-        # self._outfile.write(self.__tab + '@' + addr + '\n')
-        self._outfile.write(self.__tab + '@' + addr + ' // ' + str(self.__instr_count)  + '\n')
-        self.__instr_count += 1
+        self.__lines.append(self.__tab + '@' + addr + '\n')
 
     def _c_instr(self, dest, comp, jump=''):
         'print C-Instruction'
@@ -347,19 +372,28 @@ class CodeWriter(object):
         if jump != '':
             c_instr += ';'
         c_instr += jump
-        # self._outfile.write(self.__tab + c_instr + '\n')
-        self._outfile.write(self.__tab + c_instr + ' // ' + str(self.__instr_count) + '\n')
-        self.__instr_count += 1
+        self.__lines.append(self.__tab + c_instr + '\n')
 
     def _label(self, label):
         'print label'
-        self._outfile.write('('+label+')\n')
+        self.__lines.append('('+label+')\n')
 
     def _new_label(self):
         'generate new label for logical comparison'
         self._label_count += 1
-        return self.__LABEL_NAME + str(self._label_count)
+        return self._label_prefix + str(self._label_count)
 
     def __comment(self, arg):
         'log the command'
-        self._outfile.write('// ' + arg + '\n')
+        self.__lines.append('// ' + arg + '\n')
+
+    def __flush(self):
+        'write the buffered lines, instructions are numbered with their ROM address'
+        out = []
+        for line in self.__lines:
+            if line.startswith(self.__tab):
+                line = line[:-1] + ' // ' + str(self.__instr_count) + '\n'
+                self.__instr_count += 1
+            out.append(line)
+        self._outfile.writelines(out)
+        self.__lines = []
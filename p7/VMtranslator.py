@@ -3,6 +3,7 @@
 import sys
 import os
 import glob
+from BuildCache import BuildCache
 from CodeWriter import CodeWriter
 from Parser import Parser
 
@@ -13,7 +14,10 @@ class VMtranslator(object):
     of .asm file
     method: gen()
     '''
-    def __init__(self, file):
+    def __init__(self, file, cache=None):
+        '''file: string .vm file or directory
+        cache: BuildCache, unchanged .vm files reuse their cached code'''
+        self.__cache = cache
         if file.endswith('.vm') and os.path.isfile(file):
             self.__infilelist = [file]
             self.__outfilename = file[:-2] + 'asm'
@@ -35,10 +39,22 @@ class VMtranslator(object):
         if len(self.__infilelist) > 1:
             self.__code.writeInit()
         for infile in self.__infilelist:
+            filename = os.path.basename(infile)[:-3]
+            self.__code.setFileName(filename)
+            key = None
+            if self.__cache:
+                with open(infile, 'rb') as file:
+                    key = self.__cache.key(filename, file.read())
+                fragment = self.__cache.get(key)
+                if fragment is not None:
+                    self.__code.writeFragment(fragment.decode())
+                    continue
             parser = Parser(infile)
             while parser.hasnext():
                 command = parser.next()
                 self.__code.parse(command)
+            if key:
+                self.__cache.put(key, self.__code.fragment().encode())
         self.__code.close()
 
 if __name__ == '__main__':
@@ -47,5 +63,5 @@ if __name__ == '__main__':
         sys.exit()
 
     src = sys.argv[1]
-    vm = VMtranslator(src)
+    vm = VMtranslator(src, BuildCache.from_env('VMtranslator'))
     vm.gen()
@@ -1,5 +1,6 @@
 'generate assembly code from vm code'
 
+import os
 from VMConstant import VMConstant
 
 class CodeWriter(object):
@@ -7,13 +8,50 @@ class CodeWriter(object):
     method: parse(command)
     method: close()
     method: writeInit()
+    method: writeSubroutines()
+    method: setFileName(filename)
+    method: fragment()
+    method: writeFragment(fragment, filename)
+    method: instructions()
+
+    output modes:
+    COMMENT: vm commands and ROM addresses are written as comments
+    RELEASE: instructions and labels only
+    DEBUG:   instructions and labels, vm commands with their ROM address are
+             written to the source map file(.map) next to the output
     '''
+    COMMENT = 'comment'
+    RELEASE = 'release'
+    DEBUG = 'debug'
+
     __tab = '    '
     __LABEL_NAME = '__LABEL'
-    def __init__(self, out):
+    # shared subroutines, written once after the bootstrap code
+    __CALL = '$$CALL'
+    __RETURN = '$$RETURN'
+    __COMPARE = {'JEQ': '$$EQ', 'JGT': '$$GT', 'JLT': '$$LT'}
+    __START = '$$START'
+    def __init__(self, out=None, optimize=True, shared=False, mode=COMMENT):
+        '''out: string output .asm file, code is only kept in fragment()
+        if it's None
+        optimize: run the peephole pass on the generated code
+        shared: call, return and compare commands jump to shared subroutines
+        instead of being written inline
+        mode: COMMENT | RELEASE | DEBUG, output is written at once when closed'''
         self.__instr_count = 0
         self._label_count = -1
-        self._outfile = open(out, 'w')
+        self._label_prefix = self.__LABEL_NAME
+        self._outfile = open(out, 'w') if out else None
+        self._mapfile = os.path.splitext(out)[0] + '.map' if out and mode == self.DEBUG else None
+        self._mode = mode
+        self.__out = []    # output lines
+        self.__srcmap = [] # source map lines: address, file, vm command
+        self.__instrs = [] # written instructions
+        self._optimize = optimize
+        self._shared = shared
+        # code of current fragment: ('A', addr) | ('C', dest, comp, jump)
+        # | ('L', label) | ('#', comment)
+        self.__code = []
         self.__map = {VMConstant.add: self._add, VMConstant.sub: self._sub,
                       VMConstant.neg: self._neg, VMConstant.eq: self._eq,
                       VMConstant.gt: self._gt, VMConstant.lt: self._lt,
@@ -23,7 +61,41 @@ class CodeWriter(object):
     def close(self):
         'close file'
         if self._outfile:
+            self.__flush()
+            self._outfile.write(''.join(self.__out))
             self._outfile.close()
+            self._outfile = None
+            if self._mapfile:
+                with open(self._mapfile, 'w') as mapfile:
+                    mapfile.write(''.join(self.__srcmap))
+
+    def setFileName(self, filename):
+        '''start translating a new .vm file, the code of each file forms
+        a fragment that doesn't depend on the other files
+        filename: string file name without '.vm'
+        '''
+        self.__flush()
+        self._label_count = -1
+        self._label_prefix = filename + '.' + self.__LABEL_NAME
+
+    def fragment(self):
+        '''return: list of instructions generated since the last setFileName(),
+        ('A', addr) | ('C', dest, comp, jump) | ('L', label) | ('#', comment)'''
+        return self.__peephole(self.__code) if self._optimize else list(self.__code)
+
+    def writeFragment(self, fragment, filename=''):
+        '''write code returned by fragment(), instead of translating the file again
+        fragment: list of instructions
+        filename: string source file name in the source map
+        '''
+        self.__flush()
+        self.__write(fragment, filename)
+
+    def instructions(self):
+        '''return: list of all the written instructions in the form of fragment(),
+        they can be encoded directly without the .asm file'''
+        self.__flush()
+        return self.__instrs
 
     def writeInit(self):
         'write bootstrap code in the beginning'
@@ -40,6 +112,16 @@ class CodeWriter(object):
         self._a_instr('4')
         self._c_instr('MD', 'D-1')
         self._call('Sys.init', '0', 'bootstrap$ret.')
+        if self._shared:
+            self.__subroutines()
+
+    def writeSubroutines(self):
+        '''write the shared subroutines in the beginning when there is no bootstrap code,
+        they are skipped over'''
+        if self._shared:
+            self._goto(self.__START)
+            self.__subroutines()
+            self._label(self.__START)
 
     def parse(self, command):
         '''translate next command into assembly code
@@ -80,15 +162,12 @@ class CodeWriter(object):
         self._binary('-')
 
     def _eq(self):
-        self._sub()
         self._compare('JEQ')   # D;JEQ
 
     def _gt(self):
-        self._sub()
         self._compare('JGT')   # D;JGT
 
     def _lt(self):
-        self._sub()
         self._compare('JLT')   # D;JLT
 
     def _and(self):
@@ -116,6 +195,10 @@ class CodeWriter(object):
         self._c_instr('M', arg+'M')
 
     def _compare(self, arg):
+        if self._shared:
+            self._call_shared(self.__COMPARE[arg])
+            return
+        self._sub()
         # self._pop('D')
         label1 = self._new_label()
         self._a_instr(label1)           # @__LABEL1
@@ -220,6 +303,21 @@ class CodeWriter(object):
             self._push('0')
 
     def _call(self, func, arg, tag):
+        if self._shared:
+            if arg == '0':
+                self._a_instr('R13')
+                self._c_instr('M', '0')
+            else:
+                self._a_instr(arg)
+                self._c_instr('D', 'A')
+                self._a_instr('R13')
+                self._c_instr('M', 'D')   # R13 = arg
+            self._a_instr(func)
+            self._c_instr('D', 'A')
+            self._a_instr('R14')
+            self._c_instr('M', 'D')       # R14 = functionName
+            self._call_shared(self.__CALL, tag)
+            return
         self._a_instr(tag)
         self._c_instr('D', 'A')
         self._push()              # push return address
@@ -242,6 +340,12 @@ class CodeWriter(object):
         self._label(tag)          # (returnAddress)
 
     def _return(self):
+        if self._shared:
+            self._goto(self.__RETURN)
+            return
+        self._write_return()
+
+    def _write_return(self):
         # this sequence follows the book
         self._a_instr(VMConstant.local.value)
         self._c_instr('D', 'M')     # D(endFrame) = LCL
@@ -275,6 +379,67 @@ class CodeWriter(object):
         self._c_instr('A', 'M')     # A = return address
         self._c_instr('', '0', 'JMP')
 
+    def _call_shared(self, routine, tag=None):
+        'jump to a shared subroutine with the return address in D'
+        if tag is None:
+            tag = self._new_label()
+        self._a_instr(tag)
+        self._c_instr('D', 'A')
+        self._goto(routine)
+        self._label(tag)          # (returnAddress)
+
+    def __subroutines(self):
+        'write the shared subroutines'
+        # call: D = return address, R13 = nArgs, R14 = functionName
+        self._label(self.__CALL)
+        self._a_instr(VMConstant.SP.value)
+        self._c_instr('A', 'M')
+        self._c_instr('M', 'D')   # push return address
+        for value in [VMConstant.local.value, VMConstant.argument.value,
+                      VMConstant.this.value, VMConstant.that.value]:
+            self._a_instr(value)
+            self._c_instr('D', 'M')
+            self._a_instr(VMConstant.SP.value)
+            self._c_instr('AM', 'M+1')
+            self._c_instr('M', 'D') # push LCL, ARG, THIS, THAT
+        self._a_instr(VMConstant.SP.value)
+        self._c_instr('MD', 'M+1')  # D = SP
+        self._a_instr(VMConstant.local.value)
+        self._c_instr('M', 'D')     # LCL = SP
+        self._a_instr('R13')
+        self._c_instr('D', 'D-M')
+        self._a_instr('5')
+        self._c_instr('D', 'D-A')
+        self._a_instr(VMConstant.argument.value)
+        self._c_instr('M', 'D')     # ARG = SP - 5 - nArgs
+        self._a_instr('R14')
+        self._c_instr('A', 'M')
+        self._c_instr('', '0', 'JMP') # goto functionName
+        # return
+        self._label(self.__RETURN)
+        self._write_return()
+        # eq, gt, lt: D = return address
+        for arg, routine in self.__COMPARE.items():
+            self._label(routine)
+            self._a_instr('R13')
+            self._c_instr('M', 'D')     # save return address to R13
+            self._sub()
+            self._a_instr(routine + '.TRUE')
+            self._c_instr('', 'D', arg)
+            self._a_instr('SP')
+            self._c_instr('A', 'M-1')
+            self._c_instr('M', '0')     # false
+            self._a_instr('R13')
+            self._c_instr('A', 'M')
+            self._c_instr('', '0', 'JMP')
+            self._label(routine + '.TRUE')
+            self._a_instr('SP')
+            self._c_instr('A', 'M-1')
+            self._c_instr('M', '-1')    # true
+            self._a_instr('R13')
+            self._c_instr('A', 'M')
+            self._c_instr('', '0', 'JMP')
+
     def _push(self, src='D'):
         self._a_instr('SP')        # @SP
         self._c_instr('M', 'M+1')  # M=M+1
@@ -290,32 +455,114 @@ class CodeWriter(object):
         'print A-Instruction'
         if isinstance(addr, int):
             addr = str(addr)
-        # self._outfile.write(self.__tab + '@' + addr + '\n')
-        self._outfile.write(self.__tab + '@' + addr + ' // ' + str(self.__instr_count)  + '\n')
-        self.__instr_count += 1
+        self.__code.append(('A', addr))
 
     def _c_instr(self, dest, comp, jump=''):
         'print C-Instruction'
-        c_instr = dest
-        if dest != '':
-            c_instr += '='
-        c_instr += comp
-        if jump != '':
-            c_instr += ';'
-        c_instr += jump
-        # self._outfile.write(self.__tab + c_instr + '\n')
-        self._outfile.write(self.__tab + c_instr + ' // ' + str(self.__instr_count) + '\n')
-        self.__instr_count += 1
+        self.__code.append(('C', dest, comp, jump))
 
     def _label(self, label):
         'print label'
-        self._outfile.write('('+label+')\n')
+        self.__code.append(('L', label))
 
     def _new_label(self):
         'generate new label for logical comparison'
         self._label_count += 1
-        return self.__LABEL_NAME + str(self._label_count)
+        return self._label_prefix + str(self._label_count)
 
     def __comment(self, arg):
         'log the command'
-        self._outfile.write('// ' + arg + '\n')
+        self.__code.append(('#', arg))
+
+    def __flush(self):
+        'write the buffered code'
+        if self.__code:
+            self.__write(self.fragment())
+            self.__code = []
+
+    def __write(self, code, filename=''):
+        'buffer output lines according to the mode, instructions are counted for ROM address'
+        self.__instrs.extend(code)
+        if not self._outfile:
+            return
+        out = self.__out
+        mode = self._mode
+        tab = self.__tab if mode != self.RELEASE else ''
+        for instr in code:
+            if instr[0] == 'A':
+                line = tab + '@' + instr[1]
+            elif instr[0] == 'C':
+                _, dest, comp, jump = instr
+                line = tab + dest
+                if dest != '':
+                    line += '='
+                line += comp
+                if jump != '':
+                    line += ';' + jump
+            elif instr[0] == 'L':
+                out.append('(' + instr[1] + ')\n')
+                continue
+            else:
+                if mode == self.COMMENT:
+                    out.append('// ' + instr[1] + '\n')
+                elif mode == self.DEBUG:
+                    self.__srcmap.append('{}\t{}\t{}\n'.format(self.__instr_count, filename, instr[1]))
+                continue
+            if mode == self.COMMENT:
+                line += ' // ' + str(self.__instr_count)
+            out.append(line + '\n')
+            self.__instr_count += 1
+
+    _PUSH = (('A', 'SP'), ('C', 'M', 'M+1', ''), ('C', 'A', 'M-1', ''))
+    _POP = (('A', 'SP'), ('C', 'AM', 'M-1', ''))
+
+    @classmethod
+    def __peephole(cls, code):
+        '''peephole optimization inside basic blocks(labels end a block),
+        comments are kept but do not separate instructions:
+        push src + pop dest   => dest=src, @SP, A=M (A: address of the new top)
+        A=M, A=A-1            => A=M-1
+        A=x, @y               => @y (A-only assignment is dead)
+        @x when A is x        => removed
+        return: optimized code'''
+        out = []
+        block = []   # indexes in out of the instructions in current block
+        a_reg = None # known value of A register
+        for instr in code:
+            if instr[0] == 'L':
+                block = []
+                a_reg = None
+            elif instr[0] == 'A':
+                if instr[1] == a_reg:
+                    continue
+                while block and (out[block[-1]][0] == 'A' or
+                                 out[block[-1]][1] == 'A' and out[block[-1]][3] == ''):
+                    out[block.pop()] = None
+                block.append(len(out))
+                a_reg = instr[1]
+            elif instr[0] == 'C':
+                if 'A' in instr[1]:
+                    a_reg = None
+                tail = [out[i] for i in block[-6:]] + [instr]
+                if len(tail) == 7 and tuple(tail[:3]) == cls._PUSH and tail[3][1] == 'M' \
+                   and tail[3][2] in ('D', '0', '1', '-1') and tail[3][3] == '' \
+                   and tuple(tail[4:6]) == cls._POP \
+                   and tail[6][2:] == ('M', '') and 'M' not in tail[6][1]:
+                    src, dest = tail[3][2], tail[6][1]
+                    for i in block[-6:]:
+                        out[i] = None
+                    del block[-6:]
+                    if dest != src:
+                        block.append(len(out))
+                        out.append(('C', dest, src, ''))
+                    block.append(len(out))
+                    out.append(('A', 'SP'))
+                    instr = ('C', 'A', 'M', '')
+                    a_reg = None
+                elif block and out[block[-1]] == ('C', 'A', 'M', '') \
+                   and instr == ('C', 'A', 'A-1', ''):
+                    out[block.pop()] = None
+                    instr = ('C', 'A', 'M-1', '')
+                block.append(len(out))
+            out.append(instr)
+        return [instr for instr in out if instr is not None]
@@ -24,7 +24,9 @@ class Parser(object):
     func_command = {'function':VMConstant.function, 'call':VMConstant.call,
                     'return':VMConstant.return_}
 
-    def __init__(self, src):
+    def __init__(self, src, lines=None):
+        '''src: string .vm file
+        lines: list of strings, the contents of src, src is not read if given'''
         self.__filename = os.path.split(src)[-1]
         if self.__filename.endswith(".vm"):
             self.__filename = self.__filename[:-3]
@@ -35,19 +37,20 @@ class Parser(object):
         self.__p = re.compile(r'\s+')
         self.__num_p = re.compile(r'^\d+$')
         self.__var_p = re.compile(r'^[\_a-zA-Z.$:][\_.$:\w]*$')
-        try:
-            with open(src, 'r') as file:
-                lines = file.readlines()
-                self.__rows = len(lines)
-                # remove comments
-                lines = list(map(lambda x: x[:x.find("//")] \
-                                 if x.find("//") != -1 else x, lines))
-                # remove extra white spaces
-                # lines = list(map(self.__p.sub, [" "]*len(lines), lines))
-                self.__lines = lines
-        except FileNotFoundError:
-            print("python: can't open file '{}'".format(src))
-            sys.exit()
+        if lines is None:
+            try:
+                with open(src, 'r') as file:
+                    lines = file.readlines()
+            except FileNotFoundError:
+                print("python: can't open file '{}'".format(src))
+                sys.exit()
+        self.__rows = len(lines)
+        # remove comments
+        lines = list(map(lambda x: x[:x.find("//")] \
+                         if x.find("//") != -1 else x, lines))
+        # remove extra white spaces
+        # lines = list(map(self.__p.sub, [" "]*len(lines), lines))
+        self.__lines = lines
 
     def next(self):
         '''return: next tokens of an instruction in a tuple,
@@ -0,0 +1,338 @@
+'''VMInterpreter: run .vm files directly on a stack machine, without translation
+
+Commands are compiled into int opcode arrays, labels and functions are
+resolved to command indexes in advance. RAM follows the Hack memory map.'''
+
+import os
+import sys
+import glob
+from array import array
+from Parser import Parser
+from VMConstant import VMConstant
+
+class VMInterpreter(object):
+    '''run .vm code on a stack machine
+    method: load(file)
+    method: bootstrap()
+    method: run(steps)
+    attribute: ram, pc, halted
+    '''
+    # opcodes
+    (HALT, ADD, SUB, NEG, EQ, GT, LT, AND, OR, NOT,
+     PUSH_CONST, PUSH_SEG, PUSH_ADDR, POP_SEG, POP_ADDR,
+     GOTO, IF_GOTO, FUNCTION, CALL, RETURN) = range(20)
+
+    arithmetic = {VMConstant.add: ADD, VMConstant.sub: SUB, VMConstant.neg: NEG,
+                  VMConstant.eq: EQ, VMConstant.gt: GT, VMConstant.lt: LT,
+                  VMConstant.and_: AND, VMConstant.or_: OR, VMConstant.not_: NOT}
+    # segments addressed through a pointer
+    pointer_seg = {VMConstant.local: VMConstant.local.value,
+                   VMConstant.argument: VMConstant.argument.value,
+                   VMConstant.this: VMConstant.this.value,
+                   VMConstant.that: VMConstant.that.value}
+    STATIC = 16
+    STACK = 256
+    RAM_SIZE = 0x8000
+    MAX_CONSTANT = 0x7fff
+    seg_size = {VMConstant.temp: 8, VMConstant.pointer: 2}
+    # words an opcode pops and pushes, FUNCTION pushes arg1 words and CALL pops arg2
+    pops = {ADD: 2, SUB: 2, EQ: 2, GT: 2, LT: 2, AND: 2, OR: 2, NEG: 1, NOT: 1,
+            POP_SEG: 1, POP_ADDR: 1, IF_GOTO: 1, RETURN: 1}
+    pushes = {PUSH_CONST: 1, PUSH_SEG: 1, PUSH_ADDR: 1, CALL: 5}
+
+    def __init__(self, file=None):
+        '''file: string .vm file or directory'''
+        self.ram = array('h', bytes(2 * self.RAM_SIZE))
+        self.functions = {}
+        self.statics = {}
+        self.__ops = array('b')
+        self.__arg1 = array('l')
+        self.__arg2 = array('l')
+        self.__low = array('l')  # SP allowed before each opcode, lowest and highest
+        self.__high = array('l')
+        self.__commands = [] # (file, command) of each opcode, for error messages
+        self.pc = 0
+        self.halted = False
+        if file:
+            self.load(file)
+
+    def load(self, file):
+        '''load and compile .vm file or all .vm files in a directory,
+        execution starts at Sys.init if it exists, otherwise at the first command
+        raise: SyntaxError on undefined label or function, constant or temp and pointer
+        index out of range
+        return: self
+        '''
+        if os.path.isdir(file):
+            infilelist = sorted(glob.glob(os.path.join(file, '*.vm')))
+        else:
+            infilelist = [file]
+        ops, arg1, arg2 = [self.HALT], [0], [0] # return address of bootstrap
+        commands = [(None, None)]
+        labels = {}
+        self.functions = {}
+        self.statics = {}
+        for infile in infilelist:
+            parser = Parser(infile)
+            while parser.hasnext():
+                command = parser.next()
+                if command is None:
+                    continue
+                typ, a1, a2 = command[0], 0, 0
+                if typ == VMConstant.C_ARITHMETIC:
+                    op = self.arithmetic[command[1]]
+                elif typ == VMConstant.push or typ == VMConstant.pop:
+                    try:
+                        op, a1, a2 = self.__segment(typ, command[1], command[2])
+                    except SyntaxError as err:
+                        raise SyntaxError(self.__message(infile, command, err.msg)) from None
+                elif typ == VMConstant.label:
+                    labels[command[1]] = len(ops)
+                    continue
+                elif typ == VMConstant.goto or typ == VMConstant.if_goto:
+                    op = self.GOTO if typ == VMConstant.goto else self.IF_GOTO
+                    a1 = command[1]                  # resolved below
+                elif typ == VMConstant.function:
+                    self.functions[command[1]] = len(ops)
+                    op, a1 = self.FUNCTION, int(command[2])
+                elif typ == VMConstant.call:
+                    op, a1, a2 = self.CALL, command[1], int(command[2]) # resolved below
+                else:
+                    op = self.RETURN
+                ops.append(op)
+                arg1.append(a1)
+                arg2.append(a2)
+                commands.append((infile, command))
+        ops.append(self.HALT) # end of program
+        commands.append((None, None))
+        arg1.append(0)
+        arg2.append(0)
+        for i, op in enumerate(ops):
+            if op == self.GOTO or op == self.IF_GOTO:
+                if arg1[i] not in labels:
+                    raise SyntaxError('label "{}" not found'.format(arg1[i]))
+                arg1[i] = labels[arg1[i]]
+            elif op == self.CALL:
+                if arg1[i] not in self.functions:
+                    raise SyntaxError('function "{}" not found'.format(arg1[i]))
+                arg1[i] = self.functions[arg1[i]]
+        self.__ops = array('b', ops)
+        self.__arg1 = array('l', arg1)
+        self.__arg2 = array('l', arg2)
+        self.__low, self.__high = self.__bounds(ops, arg1, arg2)
+        self.__commands = commands
+        self.pc = self.functions.get('Sys.init', 1)
+        self.halted = False
+        return self
+
+    def bootstrap(self):
+        '''set the registers and call Sys.init like the bootstrap code of CodeWriter
+        return: self'''
+        ram = self.ram
+        # frame of call Sys.init 0: return address(HALT), LCL, ARG, THIS, THAT
+        ram[self.STACK:self.STACK+5] = array('h', (0, -1, -2, -3, -4))
+        ram[0] = self.STACK + 5                   # SP
+        ram[1] = self.STACK + 5                   # LCL
+        ram[2] = self.STACK                       # ARG
+        ram[3], ram[4] = -3, -4
+        self.pc = self.functions['Sys.init']
+        self.halted = False
+        return self
+
+    def run(self, steps=sys.maxsize):
+        '''execute commands until the step budget is used or the program halts
+        (falls off the end, returns from the bootstrap call or loops on goto itself)
+        return: number of executed commands, labels are not counted
+        raise: RuntimeError naming the command if the stack overflows RAM or underflows
+        its base at STACK, or a segment address or the frame of return is outside RAM,
+        pc is left at that command
+        '''
+        ADD, SUB, NEG, EQ, GT, LT, AND, OR, NOT = \
+            self.ADD, self.SUB, self.NEG, self.EQ, self.GT, self.LT, self.AND, self.OR, self.NOT
+        PUSH_CONST, PUSH_SEG, PUSH_ADDR, POP_SEG, POP_ADDR = \
+            self.PUSH_CONST, self.PUSH_SEG, self.PUSH_ADDR, self.POP_SEG, self.POP_ADDR
+        GOTO, IF_GOTO, FUNCTION, CALL, RETURN = \
+            self.GOTO, self.IF_GOTO, self.FUNCTION, self.CALL, self.RETURN
+        ops, arg1, arg2 = self.__ops, self.__arg1, self.__arg2
+        low, high = self.__low, self.__high
+        ram = self.ram
+        RAM_SIZE = self.RAM_SIZE
+        pc = self.pc
+        sp = ram[0]
+        left = steps
+        while left > 0:
+            op = ops[pc]
+            if not low[pc] <= sp <= high[pc]:
+                ram[0], self.pc = sp, pc
+                reason = 'stack underflow' if sp < low[pc] else 'stack overflow'
+                raise RuntimeError(self.__fault(pc, reason))
+            if op == PUSH_CONST:
+                ram[sp] = arg1[pc]
+                sp += 1
+            elif op == PUSH_SEG:
+                addr = ram[arg1[pc]] + arg2[pc]
+                if not 0 <= addr < RAM_SIZE:
+                    ram[0], self.pc = sp, pc
+                    raise RuntimeError(self.__fault(pc, f'address {addr} outside RAM'))
+                ram[sp] = ram[addr]
+                sp += 1
+            elif op == PUSH_ADDR:
+                ram[sp] = ram[arg1[pc]]
+                sp += 1
+            elif op == POP_SEG:
+                addr = ram[arg1[pc]] + arg2[pc]
+                if not 0 <= addr < RAM_SIZE:
+                    ram[0], self.pc = sp, pc
+                    raise RuntimeError(self.__fault(pc, f'address {addr} outside RAM'))
+                sp -= 1
+                ram[addr] = ram[sp]
+            elif op == POP_ADDR:
+                sp -= 1
+                ram[arg1[pc]] = ram[sp]
+            elif op == ADD:
+                sp -= 1
+                ram[sp-1] = (ram[sp-1] + ram[sp] + 32768 & 65535) - 32768
+            elif op == SUB:
+                sp -= 1
+                ram[sp-1] = (ram[sp-1] - ram[sp] + 32768 & 65535) - 32768
+            elif op == NEG:
+                ram[sp-1] = (32768 - ram[sp-1] & 65535) - 32768
+            elif op == EQ:
+                sp -= 1
+                ram[sp-1] = -1 if ram[sp-1] == ram[sp] else 0
+            elif op == GT:
+                sp -= 1
+                ram[sp-1] = -1 if ram[sp-1] > ram[sp] else 0
+            elif op == LT:
+                sp -= 1
+                ram[sp-1] = -1 if ram[sp-1] < ram[sp] else 0
+            elif op == AND:
+                sp -= 1
+                ram[sp-1] &= ram[sp]
+            elif op == OR:
+                sp -= 1
+                ram[sp-1] |= ram[sp]
+            elif op == NOT:
+                ram[sp-1] = ~ram[sp-1]
+            elif op == GOTO:
+                if arg1[pc] == pc:
+                    self.halted = True
+                    break
+                pc = arg1[pc]
+                left -= 1
+                continue
+            elif op == IF_GOTO:
+                sp -= 1
+                if ram[sp]:
+                    pc = arg1[pc]
+                    left -= 1
+                    continue
+            elif op == FUNCTION:
+                for _ in range(arg1[pc]):
+                    ram[sp] = 0
+                    sp += 1
+            elif op == CALL:
+                ram[sp] = (pc + 1 + 32768 & 65535) - 32768 # return address
+                ram[sp+1] = ram[1]
+                ram[sp+2] = ram[2]
+                ram[sp+3] = ram[3]
+                ram[sp+4] = ram[4]
+                sp += 5
+                ram[2] = sp - 5 - arg2[pc] # ARG
+                ram[1] = sp                # LCL
+                pc = arg1[pc]
+                left -= 1
+                continue
+            elif op == RETURN:
+                frame = ram[1]
+                if frame < 5 or not 0 <= ram[2] < RAM_SIZE - 1:
+                    ram[0], self.pc = sp, pc
+                    raise RuntimeError(self.__fault(pc, 'frame outside RAM'))
+                pc = ram[frame-5] & 65535 # before the return value may overwrite it
+                ram[ram[2]] = ram[sp-1]
+                sp = ram[2] + 1
+                ram[4] = ram[frame-1]
+                ram[3] = ram[frame-2]
+                ram[2] = ram[frame-3]
+                ram[1] = ram[frame-4]
+                left -= 1
+                if pc >= len(ops):
+                    self.halted = True
+                    break
+                continue
+            else: # HALT
+                self.halted = True
+                break
+            pc += 1
+            left -= 1
+        ram[0] = sp
+        self.pc = pc
+        return steps - left
+
+    def __bounds(self, ops, arg1, arg2):
+        '''return: array('l') of the lowest and of the highest SP before each opcode, the
+        words it pops must be above STACK and SP must stay in RAM after its pushes'''
+        low, high = array('l'), array('l')
+        for op, a1, a2 in zip(ops, arg1, arg2):
+            pops = a2 if op == self.CALL else self.pops.get(op, 0)
+            pushes = a1 if op == self.FUNCTION else self.pushes.get(op, 0)
+            low.append(self.STACK + pops if pops else 0)
+            high.append(self.RAM_SIZE - 1 - pushes)
+        return low, high
+
+    def __fault(self, pc, msg):
+        'return: error message of the command at pc'
+        file, command = self.__commands[pc]
+        if command is None: # end of program
+            return msg
+        return self.__message(file, command, msg)
+
+    @staticmethod
+    def __message(file, command, msg):
+        "return: 'file: command: msg', command in its .vm form, e.g. push static 3"
+        words = [word.name.rstrip('_').replace('_', '-') if isinstance(word, VMConstant)
+                 else str(word) for word in command]
+        if command[0] == VMConstant.C_ARITHMETIC:
+            words = words[1:]
+        elif command[0] == VMConstant.push or command[0] == VMConstant.pop:
+            words[2] = words[2].rpartition('.')[2] # static index is 'file.i'
+        elif len(words) == 2: # label is 'function$label'
+            words[1] = words[1].rpartition('$')[2]
+        elif command[0] == VMConstant.call:
+            words = words[:3] # without the return label the parser adds
+        return '{}: {}: {}'.format(os.path.basename(file), ' '.join(words), msg)
+
+    def __segment(self, typ, segment, index):
+        'return: (opcode, arg1, arg2) of push or pop command'
+        push = typ == VMConstant.push
+        if segment == VMConstant.constant:
+            if not push:
+                raise SyntaxError('pop to constant error')
+            if int(index) > self.MAX_CONSTANT:
+                raise SyntaxError('constant out of range 0..{}'.format(self.MAX_CONSTANT))
+            return self.PUSH_CONST, int(index), 0
+        if segment in self.seg_size and int(index) >= self.seg_size[segment]:
+            raise SyntaxError('index out of range 0..{}'.format(self.seg_size[segment] - 1))
+        if segment in self.pointer_seg:
+            return (self.PUSH_SEG if push else self.POP_SEG), self.pointer_seg[segment], int(index)
+        if segment == VMConstant.static: # index is 'file.i'
+            addr = self.statics.setdefault(index, self.STATIC + len(self.statics))
+        elif segment == VMConstant.temp:
+            addr = VMConstant.temp.value + int(index)
+        else: # pointer
+            addr = VMConstant.this.value + int(index)
+        return (self.PUSH_ADDR if push else self.POP_ADDR), addr, 0
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3) or (len(sys.argv) == 3 and not sys.argv[2].isdigit()):
+        print("Usage: python VMInterpreter.py <file.vm|directory> [steps]")
+        sys.exit()
+
+    vm = VMInterpreter(sys.argv[1])
+    if 'Sys.init' in vm.functions:
+        vm.bootstrap()
+    else:
+        vm.ram[0] = VMInterpreter.STACK
+    count = vm.run(int(sys.argv[2]) if len(sys.argv) == 3 else sys.maxsize)
+    print('{} commands{}'.format(count, ' (halted)' if vm.halted else ''))
+    print('RAM[0:16]:', vm.ram[0:16].tolist())
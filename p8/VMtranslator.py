@@ -3,18 +3,53 @@
 import sys
 import os
 import glob
+import marshal
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from BuildCache import BuildCache
 from CodeWriter import CodeWriter
 from Parser import Parser
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'p6'))
+from Code import Code # p6 encoder, for .hack output
 
 class VMtranslator(object):
     '''translator .vm file to .asm file
 
     if more than one .vm file is given, bootstrap code will be written at the beginning
-    of .asm file
+    of .asm file, the files are translated in parallel
     method: gen()
     '''
-    def __init__(self, file):
-        if file.endswith('.vm') and os.path.isfile(file):
+    def __init__(self, file, cache=None, jobs=None, optimize=True, shared=False,
+                 mode=CodeWriter.COMMENT, hack=False, asm=True, sources=None, init=None):
+        '''file: string .vm file or directory
+        cache: BuildCache, unchanged .vm files reuse their cached code
+        jobs: number of worker processes, os.cpu_count() if None
+        optimize: run the peephole pass of CodeWriter
+        shared: use shared call/return/compare subroutines to reduce code size
+        mode: output mode of CodeWriter
+        hack: also encode the code into .hack file, without reading the .asm file back
+        asm: write .asm file
+        sources: dict of .vm file name -> list of lines, translated in memory instead of
+        the files of file, which then only names the output
+        init: write the bootstrap code, by default only for more than one .vm file,
+        False leaves out the shared subroutines too, for a library linked into programs
+        translated with them, see p6/Linker'''
+        self.__cache = cache
+        self.__jobs = jobs
+        self.__optimize = optimize
+        self.__shared = shared
+        self.__hack = hack
+        self.__sources = sources
+        self.__init = init
+        if sources is not None:
+            self.__infilelist = list(sources)
+            if file.endswith('.vm'):
+                self.__outfilename = file[:-2] + 'asm'
+            else:
+                self.__outfilename = os.path.join(file,
+                                                  os.path.basename(os.path.abspath(file)) + '.asm')
+        elif file.endswith('.vm') and os.path.isfile(file):
             self.__infilelist = [file]
             self.__outfilename = file[:-2] + 'asm'
         else:
@@ -27,25 +62,87 @@ class VMtranslator(object):
             if self.__infilelist == []:
                 print('no ".vm" file found in the given directory')
                 sys.exit()
-        self.__code = CodeWriter(self.__outfilename)
+        self.__code = CodeWriter(self.__outfilename if asm else None, optimize, shared, mode)
 
     def gen(self):
         '''generate assembly code and stores in .asm file
         '''
-        if len(self.__infilelist) > 1:
+        init = len(self.__infilelist) > 1 if self.__init is None else self.__init
+        if init:
             self.__code.writeInit()
-        for infile in self.__infilelist:
-            parser = Parser(infile)
-            while parser.hasnext():
-                command = parser.next()
-                self.__code.parse(command)
+        elif self.__init is None:
+            self.__code.writeSubroutines()
+        keys = [None] * len(self.__infilelist)
+        fragments = [None] * len(self.__infilelist)
+        if self.__cache:
+            for i, infile in enumerate(self.__infilelist):
+                if self.__sources is not None:
+                    content = ''.join(self.__sources[infile]).encode()
+                else:
+                    with open(infile, 'rb') as file:
+                        content = file.read()
+                keys[i] = self.__cache.key(os.path.basename(infile), content,
+                                           str(self.__optimize), str(self.__shared))
+                fragment = self.__cache.get(keys[i])
+                if fragment is not None:
+                    fragments[i] = marshal.loads(fragment)
+        todo = [i for i, fragment in enumerate(fragments) if fragment is None]
+        infiles = [self.__infilelist[i] for i in todo]
+        lines = [self.__sources and self.__sources[infile] for infile in infiles]
+        task = functools.partial(translate, optimize=self.__optimize, shared=self.__shared)
+        if len(infiles) > 1 and self.__jobs != 1:
+            with ProcessPoolExecutor(self.__jobs) as pool:
+                results = list(pool.map(task, infiles, lines))
+        else:
+            results = list(map(task, infiles, lines))
+        for i, fragment in zip(todo, results):
+            fragments[i] = fragment
+            if keys[i]:
+                self.__cache.put(keys[i], marshal.dumps(fragment))
+        for infile, fragment in zip(self.__infilelist, fragments):
+            self.__code.writeFragment(fragment, os.path.basename(infile))
         self.__code.close()
+        if self.__hack:
+            bincode = Code().assemble(self.__code.instructions())
+            with open(self.__outfilename[:-3] + 'hack', 'w') as outfile:
+                outfile.write(Code.to_text(bincode))
+
+def translate(infile, lines=None, optimize=True, shared=False):
+    '''translate a .vm file on its own, runs in the worker processes
+    lines: contents of infile, if not read from the file
+    return: list of instructions, see CodeWriter.fragment()'''
+    code = CodeWriter(optimize=optimize, shared=shared)
+    code.setFileName(os.path.basename(infile)[:-3])
+    parser = Parser(infile, lines)
+    while parser.hasnext():
+        command = parser.next()
+        code.parse(command)
+    return code.fragment()
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python VMtranslator.py <file.vm|directory>")
-        sys.exit()
+    argparser = argparse.ArgumentParser(description='translate .vm files to a .asm file')
+    argparser.add_argument('src', help='.vm file or directory')
+    argparser.add_argument('-j', '--jobs', type=int, help='number of worker processes')
+    argparser.add_argument('--no-opt', action='store_true', help='disable peephole optimization')
+    argparser.add_argument('--shared', action='store_true',
+                           help='use shared call/return/compare subroutines')
+    modes = argparser.add_mutually_exclusive_group()
+    modes.add_argument('--release', dest='mode', action='store_const', const=CodeWriter.RELEASE,
+                       default=CodeWriter.COMMENT, help='write instructions without comments')
+    modes.add_argument('--debug', dest='mode', action='store_const', const=CodeWriter.DEBUG,
+                       help='write vm commands to a .map file instead of comments')
+    argparser.add_argument('--hack', action='store_true',
+                           help='also write the .hack file, encoded in memory')
+    argparser.add_argument('--no-asm', action='store_true', help='do not write the .asm file')
+    inits = argparser.add_mutually_exclusive_group()
+    inits.add_argument('--init', action='store_true', default=None,
+                       help='write the bootstrap code, even for a single .vm file')
+    inits.add_argument('--no-init', dest='init', action='store_false',
+                       help='write neither bootstrap code nor shared subroutines, '
+                       'to link the code with p6/Linker.py')
+    args = argparser.parse_args()
 
-    src = sys.argv[1]
-    vm = VMtranslator(src)
+    vm = VMtranslator(args.src, BuildCache.from_env('VMtranslator'), args.jobs,
+                      not args.no_opt, args.shared, args.mode, args.hack, not args.no_asm,
+                      init=args.init)
     vm.gen()
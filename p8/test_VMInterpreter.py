@@ -0,0 +1,109 @@
+'tests of the checks of VMInterpreter on constants, segment addresses and the stack'
+
+import os
+import sys
+import tempfile
+import unittest
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from VMInterpreter import VMInterpreter
+
+class TestVMInterpreter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load(self, *commands):
+        'return: VMInterpreter of commands in Main.vm, with the stack at 256'
+        infile = os.path.join(self.directory.name, 'Main.vm')
+        with open(infile, 'w') as file:
+            file.write('\n'.join(commands) + '\n')
+        vm = VMInterpreter(infile)
+        vm.ram[0] = VMInterpreter.STACK
+        return vm
+
+    def test_run(self):
+        vm = self.load('push constant 32767', 'pop pointer 1', 'push constant 7', 'pop that 0')
+        vm.run()
+        self.assertTrue(vm.halted)
+        self.assertEqual(vm.ram[32767], 7)
+
+    def test_constant_out_of_range(self):
+        with self.assertRaisesRegex(SyntaxError, r'Main\.vm: push constant 32768: '
+                                                 r'constant out of range'):
+            self.load('push constant 32768')
+
+    def test_index_out_of_range(self):
+        with self.assertRaisesRegex(SyntaxError, r'pop temp 8: index out of range 0\.\.7'):
+            self.load('push constant 1', 'pop temp 8')
+        with self.assertRaisesRegex(SyntaxError, r'push pointer 2: index out of range 0\.\.1'):
+            self.load('push pointer 2')
+
+    def test_negative_pointer(self):
+        vm = self.load('push constant 1', 'neg', 'pop pointer 1', 'push that 0')
+        with self.assertRaisesRegex(RuntimeError, r'Main\.vm: push that 0: address -1 '
+                                                  r'outside RAM'):
+            vm.run()
+        self.assertEqual(vm.pc, 4) # at push that 0
+        self.assertEqual(vm.ram[0], VMInterpreter.STACK)
+
+    def test_negative_index(self):
+        vm = self.load('push constant 5', 'pop pointer 0', 'push constant 1', 'pop this 0',
+                       'push constant 9', 'neg', 'pop pointer 0', 'push constant 2',
+                       'pop this 3')
+        with self.assertRaisesRegex(RuntimeError, r'pop this 3: address -6 outside RAM'):
+            vm.run()
+        self.assertEqual(vm.ram[5], 1)
+
+    def test_address_past_ram(self):
+        vm = self.load('push constant 32767', 'pop pointer 1', 'push that 1')
+        with self.assertRaisesRegex(RuntimeError, r'push that 1: address 32768 outside RAM'):
+            vm.run()
+
+    def test_stack_overflow(self):
+        vm = self.load('label LOOP', 'push constant 1', 'goto LOOP')
+        with self.assertRaisesRegex(RuntimeError, r'Main\.vm: push constant 1: stack overflow'):
+            vm.run()
+        self.assertEqual(vm.pc, 1)
+        self.assertEqual(vm.ram[0], VMInterpreter.RAM_SIZE - 1)
+
+    def test_runaway_recursion(self):
+        vm = self.load('function Sys.init 0', 'call Sys.init 0')
+        vm.bootstrap()
+        with self.assertRaisesRegex(RuntimeError, r'call Sys\.init 0: stack overflow'):
+            vm.run()
+        self.assertGreater(vm.ram[0], VMInterpreter.RAM_SIZE - 6)
+
+    def test_stack_underflow(self):
+        vm = self.load('function Sys.init 0', *['pop temp 0'] * 300)
+        vm.bootstrap()
+        with self.assertRaisesRegex(RuntimeError, r'pop temp 0: stack underflow'):
+            vm.run()
+        self.assertFalse(vm.halted)
+        self.assertEqual(vm.ram[0], VMInterpreter.STACK)
+        self.assertEqual(vm.pc, vm.functions['Sys.init'] + 6) # after the 5 words of the frame
+
+    def test_arithmetic_underflow(self):
+        vm = self.load('push constant 1', 'add')
+        with self.assertRaisesRegex(RuntimeError, r'Main\.vm: add: stack underflow'):
+            vm.run()
+        self.assertEqual(vm.ram[0], VMInterpreter.STACK + 1)
+
+    def test_return_without_frame(self):
+        vm = self.load('push constant 1', 'return')
+        with self.assertRaisesRegex(RuntimeError, r'Main\.vm: return: frame outside RAM'):
+            vm.run()
+
+    def test_simple_function(self):
+        'the registers and arguments of SimpleFunctionVME.tst'
+        vm = self.load('function SimpleFunction.test 2', 'push local 0', 'push local 1', 'add',
+                       'not', 'push argument 0', 'add', 'push argument 1', 'sub', 'return')
+        vm.ram[0:5] = vm.ram.__class__('h', (317, 317, 310, 3000, 4000))
+        vm.ram[310:317] = vm.ram.__class__('h', (1234, 37, 9, 305, 300, 3010, 4010))
+        self.assertEqual(vm.run(10), 10)
+        self.assertEqual(vm.ram[0:5].tolist() + [vm.ram[310]], [311, 305, 300, 3010, 4010, 1196])
+
+if __name__ == '__main__':
+    unittest.main()